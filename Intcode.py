@@ -1,4 +1,8 @@
-from typing import List, Tuple
+import sys
+import time
+from array import array
+from collections import deque
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
 
 # opcodes for the Intcode machine
 ADD = 1
@@ -24,80 +28,487 @@ OPCODE_LENGTHS = {ADD: 4,
                   SETRELATIVEBASE: 2,
                   HALT: 1,
                   }
+# opcodes that write to the address their last parameter points at
+WRITES = {ADD, MULTIPLY, INPUT, LESSTHAN, EQUALS}
 
 # parameter modes for the Intcode machine
 POSITION = 0
 IMMEDIATE = 1
 RELATIVE = 2
 
+# returned by IntcodeVM instead of an output when the VM is waiting for input. Resume the VM by
+# calling next() on it again after adding input.
+NEEDS_INPUT = 'needs input'
+# returned by IntcodeVM.resume() when the VM has halted
+HALTED = 'halted'
+
+# memory is allocated in pages of this many cells by the DenseMemory and PagedMemory backends
+PAGE_SHIFT = 10
+PAGE_SIZE = 1 << PAGE_SHIFT
+PAGE_MASK = PAGE_SIZE - 1
+
+# execution engines for the Intcode machine
+LADDER = 'ladder'  # decode each instruction and walk an if/elif chain to execute it
+TABLE = 'table'  # dispatch to a handler specialised for the instruction's opcode and modes
+
+# Python source for the table engine's instruction handlers. Handlers are called as
+# handler(vm, mem, code, ip) and return the address of the next instruction. {pN} is replaced by
+# an expression for the value of parameter N and {tN} by an expression for the address parameter
+# N points at, according to that parameter's mode. Handlers that write to memory drop the written
+# address from the handler cache `code`, so self-modifying programs stay correct. A handler may
+# raise IndexError when it reaches past the end of memory or to a negative address, so it must not
+# change anything before its last memory access.
+HANDLER_TEMPLATES = {
+    ADD: ('t = {t3}\n'
+          'mem[t] = {p1} + {p2}\n'
+          'if t in code:\n'
+          '    del code[t]\n'
+          'return ip + 4'),
+    MULTIPLY: ('t = {t3}\n'
+               'mem[t] = {p1} * {p2}\n'
+               'if t in code:\n'
+               '    del code[t]\n'
+               'return ip + 4'),
+    INPUT: ('t = {t1}\n'
+            'mem[t] = vm.inputs[0]\n'
+            'vm.inputs.popleft()\n'
+            'if t in code:\n'
+            '    del code[t]\n'
+            'return ip + 2'),
+    OUTPUT: ('vm.outputs.append({p1})\n'
+             'return ip + 2'),
+    JUMPIFTRUE: 'return {p2} if {p1} != 0 else ip + 3',
+    JUMPIFFALSE: 'return {p2} if {p1} == 0 else ip + 3',
+    LESSTHAN: ('t = {t3}\n'
+               'mem[t] = 1 if {p1} < {p2} else 0\n'
+               'if t in code:\n'
+               '    del code[t]\n'
+               'return ip + 4'),
+    EQUALS: ('t = {t3}\n'
+             'mem[t] = 1 if {p1} == {p2} else 0\n'
+             'if t in code:\n'
+             '    del code[t]\n'
+             'return ip + 4'),
+    SETRELATIVEBASE: ('vm.relativebase += {p1}\n'
+                      'return ip + 2'),
+    HALT: 'return ip',
+}
+
+
+def decode_instruction(instruction: int) -> Tuple[int, Tuple[int, ...]]:
+    """Return the opcode of the given instruction, and the parameter modes it may need to operate.
+    Fills any parameter mode that is not explicitly given with the default."""
+    instruction = str(instruction)  # e.g. '1002'
+    opcode = int(instruction[-2:])
+    remainder = list(instruction[:-2])  # may be [] if a bare opcode was given (e.g. '2')
+    num_params = OPCODE_LENGTHS[opcode] - 1  # -1 for the opcode itself
+    modes = []
+    while num_params > 0:
+        try:
+            modes.append(int(remainder.pop()))
+        except IndexError:
+            # no more modes were given in the instruction, so use the position mode default
+            modes.append(POSITION)
+        num_params -= 1
+    return opcode, tuple(modes)
+
+
+# instructions already decoded by any VM, keyed by their value, so that VMs sharing a program (such
+# as forks) do not decode the same instructions again
+_decoded_instructions = {}
+
+# handlers already built by build_handler(), keyed by (opcode, modes)
+_handlers = {}
+
+
+def build_handler(opcode: int, modes: Tuple[int, ...]):
+    """Return the table engine's handler for the given opcode and parameter modes."""
+    try:
+        return _handlers[opcode, modes]
+    except KeyError:
+        pass
+    written = len(modes) if opcode in WRITES else None
+    lines = []
+    params = {}
+    for num, mode in enumerate(modes, start=1):
+        if mode == IMMEDIATE and num != written:
+            params[f'p{num}'] = f'mem[ip + {num}]'
+            continue
+        if mode == RELATIVE:
+            lines.append(f'a{num} = vm.relativebase + mem[ip + {num}]')
+        else:  # writes ignore IMMEDIATE and treat it as POSITION
+            lines.append(f'a{num} = mem[ip + {num}]')
+        # lists and arrays would wrap negative addresses around to the end of memory
+        lines.append(f'if a{num} < 0:')
+        lines.append("    raise IndexError('Intcode memory address out of range')")
+        params[f't{num}'] = f'a{num}'
+        params[f'p{num}'] = f'mem[ip + {num}]' if mode == IMMEDIATE else f'mem[a{num}]'
+    lines.append(HANDLER_TEMPLATES[opcode].format(**params))
+    body = '\n'.join(lines).replace('\n', '\n    ')
+    namespace = {}
+    exec(f'def handler(vm, mem, code, ip):\n    {body}\n', namespace)
+    handler = _handlers[opcode, modes] = namespace['handler']
+    return handler
+
+
+class DenseMemory(array):
+    """Intcode memory backed by a single contiguous array('q'), grown a page at a time.
+
+    Every cell up to the highest address touched is allocated, so this suits programs that keep
+    their data close to their code. Values must fit in a signed 64-bit integer."""
+    def __new__(cls, values: Iterable[int] = ()):
+        memory = super().__new__(cls, 'q', values)
+        memory.peak_nbytes = memory.nbytes
+        return memory
+
+    @property
+    def nbytes(self) -> int:
+        return len(self) * self.itemsize
+
+    def ensure(self, addr):
+        """Grow memory so that it includes the given address."""
+        if addr >= len(self):
+            cells = (addr // PAGE_SIZE + 1) * PAGE_SIZE - len(self)
+            self.frombytes(bytes(cells * self.itemsize))
+            self.peak_nbytes = max(self.peak_nbytes, self.nbytes)
+
+    def fork(self) -> 'DenseMemory':
+        """Return a copy of memory. Dense memory has nothing to share, so the copy is complete."""
+        return DenseMemory(self)
+
+
+class PagedMemory:
+    """Sparse Intcode memory: a dict of array('q') pages, each allocated on first write.
+
+    Reading an address that was never written returns 0 without allocating anything, so programs
+    that touch huge addresses only pay for the pages they actually write to. Values must fit in a
+    signed 64-bit integer.
+
+    Forks share their pages copy-on-write: a page is only copied when one of the memories sharing
+    it is written to."""
+    def __init__(self, values: Iterable[int] = ()):
+        values = list(values)
+        self._pages = {}
+        for start in range(0, len(values), PAGE_SIZE):
+            page = array('q', values[start:start + PAGE_SIZE])
+            page.frombytes(bytes((PAGE_SIZE - len(page)) * page.itemsize))
+            self._pages[start >> PAGE_SHIFT] = page
+        self._owned = set(self._pages)  # numbers of the pages no other memory shares
+        self._length = len(values)  # one past the highest address touched
+        self.peak_nbytes = self.nbytes
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._pages) * PAGE_SIZE * 8
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, addr: int) -> int:
+        if addr < 0:
+            raise IndexError('Intcode memory address out of range')
+        page = self._pages.get(addr >> PAGE_SHIFT)
+        if page is None:
+            return 0
+        return page[addr & PAGE_MASK]
+
+    def __setitem__(self, addr: int, val: int):
+        if addr < 0:
+            raise IndexError('Intcode memory address out of range')
+        number = addr >> PAGE_SHIFT
+        if number in self._owned:
+            self._pages[number][addr & PAGE_MASK] = val
+        else:
+            self._own_page(number)[addr & PAGE_MASK] = val
+        if addr >= self._length:
+            self._length = addr + 1
+
+    def _own_page(self, number: int) -> array:
+        """Return the page with the given number after making sure no other memory shares it,
+        copying the shared page or allocating a new one as needed."""
+        try:
+            page = array('q', self._pages[number])
+        except KeyError:
+            page = array('q', bytes(PAGE_SIZE * 8))
+        self._pages[number] = page
+        self._owned.add(number)
+        self.peak_nbytes = max(self.peak_nbytes, self.nbytes)
+        return page
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def ensure(self, addr):
+        """Extend memory so that it includes the given address. No pages are allocated until the
+        address is written to."""
+        if addr >= self._length:
+            self._length = addr + 1
+
+    def tolist(self) -> List[int]:
+        """Return the contents of memory up to the highest address touched, as a list."""
+        return [self[addr] for addr in range(self._length)]
+
+    def pages(self) -> Iterator[Tuple[int, array]]:
+        """Yield (page number, page) for every page allocated so far, in address order. The pages
+        must not be modified."""
+        for number in sorted(self._pages):
+            yield number, self._pages[number]
+
+    def fork(self) -> 'PagedMemory':
+        """Return a copy of memory that shares all of its pages with this one until either is
+        written to."""
+        forked = PagedMemory()
+        forked._pages = dict(self._pages)
+        forked._length = self._length
+        forked.peak_nbytes = self.nbytes
+        self._owned = set()  # every page is shared with the fork now
+        return forked
+
+
+def fork_memory(memory):
+    """Return an independent copy of an Intcode memory backend, sharing pages copy-on-write where
+    the backend supports it."""
+    if isinstance(memory, list):
+        return list(memory)
+    return memory.fork()
+
+
+def memory_nbytes(memory) -> int:
+    """Return the number of bytes used by an Intcode memory backend. For plain lists this is the
+    size of the list itself, not counting the int objects it refers to."""
+    if isinstance(memory, list):
+        return sys.getsizeof(memory)
+    return memory.nbytes
+
+
+class InputExhausted(Exception):
+    """Raised by IntcodeVM.run() when the program needs more input than it was given."""
+
+
+class IntcodeSnapshot(NamedTuple):
+    """The complete state of an IntcodeVM at some point of its execution. The memory in a snapshot
+    must not be modified; restore the snapshot with IntcodeVM.from_snapshot() instead."""
+    memory: object
+    ip: int
+    relativebase: int
+    inputs: Tuple[int, ...]
+    outputs: Tuple[int, ...]
+    halted: bool
+    steps: int
+
 
 class IntcodeVM:
-    def __init__(self, memory: List[int], inputs: list):
+    def __init__(self, memory: List[int], inputs: Iterable[int], outputs: list = None,
+                 decode_cache: bool = True, engine: str = LADDER, profiler=None, tracer=None):
+        """Create a virtual machine running the program in memory. memory is a list of ints, which
+        is modified in place, or a memory backend such as DenseMemory or PagedMemory. The inputs
+        are copied into the VM's input queue.
+
+        If a profiler (such as an IntcodeProfiler) is given, every instruction executed is reported
+        to it, using the table engine's handlers whatever the engine. VMs without a profiler do not
+        pay for profiling at all.
+
+        If a tracer (such as an IntcodeTracer) is given, every input consumed and output produced
+        is reported to it, and it is handed the VM to checkpoint whenever the step count reaches its
+        next_checkpoint. Traced VMs also use the table engine's handlers. A VM cannot have both a
+        profiler and a tracer."""
         self.memory = memory
-        self.inputs = inputs
-        self.outputs = []
+        self._peak_list_nbytes = memory_nbytes(memory) if isinstance(memory, list) else 0
+        self.inputs = deque(inputs)
+        self.outputs = outputs if outputs is not None else []
         self.ip = 0
         self.relativebase = 0
         self.halted = False
+        self.steps = 0  # number of instructions executed so far
+        # decoded instructions keyed by address, or None if every instruction should be decoded
+        # afresh (only useful for benchmarking the decoder). The table engine keeps its own cache.
+        self.decode_cache = decode_cache
+        self._decoded = ({} if decode_cache and engine == LADDER and profiler is None
+                         and tracer is None else None)
+        # (handler, stop) pairs keyed by address, for the table engine. stop is the opcode of
+        # instructions that end a run of the engine (OUTPUT and HALT) and 0 for all others.
+        self._handlers = {}
+        # (handler, event) pairs keyed by address, for traced VMs. event is the opcode of
+        # instructions the tracer hears about or that end a run (INPUT, OUTPUT and HALT) and 0 for
+        # all others.
+        self._traced = {} if tracer is not None else None
+        if engine == LADDER:
+            self._execute = self._execute_ladder
+        elif engine == TABLE:
+            self._execute = self._execute_table
+        else:
+            raise ValueError(f'Unknown Intcode engine {engine!r}')
+        self.engine = engine
+        self.profiler = profiler
+        if profiler is not None:
+            self._execute = self._execute_profiled
+        self.tracer = tracer
+        if tracer is not None:
+            if profiler is not None:
+                raise ValueError('An IntcodeVM cannot have both a profiler and a tracer')
+            self._execute = self._execute_traced
 
-    def decode(self, addr) -> Tuple[int, List[int]]:
-        """Return the opcode at the given address, and the list of parameter modes it may need to
-        operate. Fills any parameter mode that is not explicitly given with the default."""
-        instruction = str(self.memory[addr])  # e.g. '1002'
-        opcode = int(instruction[-2:])
-        remainder = list(instruction[:-2])  # may be [] if a bare opcode was given (e.g. '2')
-        num_params = OPCODE_LENGTHS[opcode] - 1  # -1 for the opcode itself
-        modes = []
-        while num_params > 0:
+    def decode(self, addr) -> Tuple[int, Tuple[int, ...]]:
+        """Return the opcode at the given address, and the parameter modes it may need to operate.
+        Fills any parameter mode that is not explicitly given with the default.
+
+        Decoded instructions are cached by address. The cache entry for an address is dropped
+        whenever that address is written to, so self-modifying programs are decoded again."""
+        if self._decoded is not None:
             try:
-                modes.append(int(remainder.pop()))
-            except IndexError:
-                # no more modes were given in the instruction, so use the position mode default
-                modes.append(POSITION)
-            num_params -= 1
-        return opcode, modes
+                return self._decoded[addr]
+            except KeyError:
+                pass
+        if addr < 0:
+            raise IndexError('Intcode memory address out of range')
+        instruction = self.memory[addr]
+        if not self.decode_cache:
+            return decode_instruction(instruction)
+        try:
+            decoded = _decoded_instructions[instruction]
+        except KeyError:
+            decoded = _decoded_instructions[instruction] = decode_instruction(instruction)
+        if self._decoded is not None:
+            self._decoded[addr] = decoded
+        return decoded
 
     def read(self, addr, mode=IMMEDIATE) -> int:
         """Read from memory at the given address, using the given mode."""
         if mode == POSITION:  # dereference a pointer
-            if self.memory[addr] > len(self.memory):
-                self.memory.extend([0] * (self.memory[addr] - len(self.memory) + 1))
-            return self.memory[self.memory[addr]]
-        elif mode == IMMEDIATE:
-            return self.memory[addr]
+            addr = self.memory[addr]
         elif mode == RELATIVE:
-            if addr + self.relativebase > len(self.memory):
-                self.memory.extend([0] * (addr + self.relativebase - len(self.memory) + 1))
-            return self.memory[addr + self.relativebase]
+            addr = self.memory[addr] + self.relativebase
+        if addr >= len(self.memory):
+            self._grow(addr)
+        elif addr < 0:  # which lists and arrays would wrap around to the end of memory
+            raise IndexError('Intcode memory address out of range')
+        return self.memory[addr]
 
     def write(self, val, addr, mode=POSITION):
         """Write val to memory at the given address, using the given mode."""
-        if addr + self.relativebase > len(self.memory):
-            self.memory.extend([0] * (addr + self.relativebase))
         if mode == RELATIVE:
-            self.memory[addr + self.relativebase] = val
-        else:  # TODO: does this need support for IMMEDIATE and POSITION?
-            self.memory[addr] = val
+            addr += self.relativebase
+        # writes treat IMMEDIATE as POSITION: addr is the address written to in both modes
+        if addr >= len(self.memory):
+            self._grow(addr)
+        elif addr < 0:
+            raise IndexError('Intcode memory address out of range')
+        self.memory[addr] = val
+        # the program wrote over (possibly) its own code
+        if self._decoded is not None:
+            self._decoded.pop(addr, None)
+        self._handlers.pop(addr, None)
+        if self._traced is not None:
+            self._traced.pop(addr, None)
+
+    def _grow_for(self, addr) -> bool:
+        """Extend memory to cover every address the instruction at addr reads or writes. Return
+        whether memory had to be extended, which it is not if any of those addresses is negative."""
+        opcode, modes = self.decode(addr)
+        highest = addr + len(modes)
+        if highest >= len(self.memory):  # the parameters themselves are past the end
+            self._grow(highest)
+            return True
+        written = len(modes) if opcode in WRITES else None
+        lowest = 0
+        for num, mode in enumerate(modes, start=1):
+            if mode == POSITION or num == written and mode == IMMEDIATE:
+                target = self.memory[addr + num]
+            elif mode == RELATIVE:
+                target = self.memory[addr + num] + self.relativebase
+            else:
+                continue
+            highest = max(highest, target)
+            lowest = min(lowest, target)
+        if highest < len(self.memory) or lowest < 0:
+            return False
+        self._grow(highest)
+        return True
+
+    def _grow(self, addr):
+        """Extend memory so that it includes the given address."""
+        if isinstance(self.memory, list):
+            self.memory.extend([0] * (addr - len(self.memory) + 1))
+            self._peak_list_nbytes = max(self._peak_list_nbytes, memory_nbytes(self.memory))
+        else:
+            self.memory.ensure(addr)
+
+    @property
+    def peak_memory(self) -> int:
+        """The largest number of bytes the VM's memory has used so far (see memory_nbytes)."""
+        if isinstance(self.memory, list):
+            return self._peak_list_nbytes
+        return self.memory.peak_nbytes
+
+    def snapshot(self) -> IntcodeSnapshot:
+        """Return a snapshot of the VM's current state. The snapshot's memory shares pages with the
+        VM's memory where the memory backend allows it."""
+        return IntcodeSnapshot(fork_memory(self.memory), self.ip, self.relativebase,
+                               tuple(self.inputs), tuple(self.outputs), self.halted, self.steps)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: IntcodeSnapshot, **options) -> 'IntcodeVM':
+        """Return a new VM continuing from the given snapshot. The snapshot itself is left
+        untouched, so it can be restored any number of times. Options are passed on to
+        IntcodeVM()."""
+        vm = cls(fork_memory(snapshot.memory), snapshot.inputs, list(snapshot.outputs),
+                 **options)
+        vm.ip = snapshot.ip
+        vm.relativebase = snapshot.relativebase
+        vm.halted = snapshot.halted
+        vm.steps = snapshot.steps
+        return vm
+
+    def fork(self) -> 'IntcodeVM':
+        """Return a new VM with the same state as this one, which can be run independently. The VMs
+        share memory pages until one of them writes to a page, where the memory backend allows
+        it. The new VM shares the profiler, if any, but is not traced."""
+        forked = type(self)(fork_memory(self.memory), self.inputs, list(self.outputs),
+                            decode_cache=self.decode_cache, engine=self.engine,
+                            profiler=self.profiler)
+        forked.ip = self.ip
+        forked.relativebase = self.relativebase
+        forked.halted = self.halted
+        forked.steps = self.steps
+        forked._peak_list_nbytes = self._peak_list_nbytes
+        # instructions decode the same way in both VMs until one of them modifies its code
+        forked._decoded = None if self._decoded is None else dict(self._decoded)
+        forked._handlers = dict(self._handlers)
+        return forked
 
     def add_input(self, value: int):
         self.inputs.append(value)
 
     def run(self):
         """Run the virtual machine until it executes operation 99 (opcode HALT), then return the
-        output list."""
-        while True:
-            try:
-                next(self)
-            except StopIteration:
-                return self.outputs
+        output list. Raise InputExhausted if the program runs out of input first."""
+        if self.resume() is NEEDS_INPUT:
+            raise InputExhausted(f'The program needs input at address {self.ip}')
+        return self.outputs
+
+    def resume(self) -> str:
+        """Run the virtual machine until it halts or needs input that has not been given yet,
+        collecting every output it produces on the way in the output list. Return HALTED or
+        NEEDS_INPUT accordingly."""
+        try:
+            return self._execute(stop_on_output=False)
+        except StopIteration:
+            return HALTED
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        """Run the virtual machine until it produces its next output."""
+        """Run the virtual machine until it produces its next output, or until it needs input that
+        has not been given yet, in which case return NEEDS_INPUT."""
+        return self._execute()
+
+    def _execute_ladder(self, stop_on_output=True):
+        """Run the virtual machine until it produces its next output (unless stop_on_output is
+        false) or needs input, using the LADDER engine."""
         opcode, modes = self.decode(self.ip)
         while True:
+            self.steps += 1
             if opcode == HALT:
                 self.halted = True
                 raise StopIteration
@@ -105,25 +516,29 @@ class IntcodeVM:
                 a = self.read(self.ip + 1, modes[0])
                 b = self.read(self.ip + 2, modes[1])
                 target = self.read(self.ip + 3)
-                self.write(a + b, target)
+                self.write(a + b, target, modes[2])
                 self.ip += 4
             elif opcode == MULTIPLY:  # code 2
                 a = self.read(self.ip + 1, modes[0])
                 b = self.read(self.ip + 2, modes[1])
                 target = self.read(self.ip + 3)
-                self.write(a * b, target)
+                self.write(a * b, target, modes[2])
                 self.ip += 4
             elif opcode == INPUT:  # code 3
-                mode = modes.pop(0)
+                if not self.inputs:
+                    self.steps -= 1  # the instruction will run again once there is input
+                    return NEEDS_INPUT
+                mode = modes[0]
                 target = self.read(self.ip + 1)
-                val = self.inputs.pop(0)
+                val = self.inputs.popleft()
                 self.write(val, target, mode)
                 self.ip += 2
             elif opcode == OUTPUT:  # code 4
                 val = self.read(self.ip + 1, modes[0])
                 self.outputs.append(val)
                 self.ip += 2
-                return val
+                if stop_on_output:
+                    return val
             elif opcode == JUMPIFTRUE:  # code 5
                 val = self.read(self.ip + 1, modes[0])
                 addr = self.read(self.ip + 2, modes[1])
@@ -143,20 +558,152 @@ class IntcodeVM:
                 b = self.read(self.ip + 2, modes[1])
                 target = self.read(self.ip + 3)
                 if a < b:
-                    self.write(1, target)
+                    self.write(1, target, modes[2])
                 else:
-                    self.write(0, target)
+                    self.write(0, target, modes[2])
                 self.ip += 4
             elif opcode == EQUALS:  # code 8
                 a = self.read(self.ip + 1, modes[0])
                 b = self.read(self.ip + 2, modes[1])
                 target = self.read(self.ip + 3)
                 if a == b:
-                    self.write(1, target)
+                    self.write(1, target, modes[2])
                 else:
-                    self.write(0, target)
+                    self.write(0, target, modes[2])
                 self.ip += 4
             elif opcode == SETRELATIVEBASE:
                 self.relativebase += self.read(self.ip + 1, modes[0])
                 self.ip += 2
             opcode, modes = self.decode(self.ip)
+
+    def _execute_table(self, stop_on_output=True):
+        """Run the virtual machine until it produces its next output (unless stop_on_output is
+        false) or needs input, using the TABLE engine."""
+        mem = self.memory
+        code = self._handlers
+        ip = self.ip
+        steps = 0
+        try:
+            while True:
+                try:
+                    handler, stop = code[ip]
+                except KeyError:
+                    opcode, modes = self.decode(ip)
+                    handler = build_handler(opcode, modes)
+                    stop = opcode if opcode in (OUTPUT, HALT) else 0
+                    code[ip] = handler, stop
+                try:
+                    next_ip = handler(self, mem, code, ip)
+                except IndexError:
+                    # the instruction reached past the end of memory, or past the end of the input
+                    # queue, before changing anything
+                    if self._grow_for(ip):
+                        continue
+                    if not self.inputs and self.decode(ip)[0] == INPUT:
+                        return NEEDS_INPUT
+                    raise
+                steps += 1
+                ip = next_ip
+                if stop:
+                    if stop == HALT:
+                        self.halted = True
+                        raise StopIteration
+                    if stop_on_output:
+                        return self.outputs[-1]
+        finally:
+            self.ip = ip
+            self.steps += steps
+
+    def _execute_profiled(self, stop_on_output=True):
+        """Run the virtual machine until it produces its next output (unless stop_on_output is
+        false) or needs input, reporting every instruction to the profiler. Instructions are
+        executed with the TABLE engine's handlers."""
+        profiler = self.profiler
+        mem = self.memory
+        code = self._handlers
+        ip = self.ip
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    handler, stop = code[ip]
+                except KeyError:
+                    opcode, modes = self.decode(ip)
+                    handler = build_handler(opcode, modes)
+                    stop = opcode if opcode in (OUTPUT, HALT) else 0
+                    code[ip] = handler, stop
+                opcode, modes = self.decode(ip)
+                peak_memory = self.peak_memory
+                try:
+                    next_ip = handler(self, mem, code, ip)
+                except IndexError:
+                    if self._grow_for(ip):
+                        profiler.memory_grew(self.steps, ip, self.peak_memory)
+                        continue
+                    if not self.inputs and opcode == INPUT:
+                        return NEEDS_INPUT
+                    raise
+                self.steps += 1
+                profiler.record(ip, opcode, modes, next_ip)
+                if self.peak_memory != peak_memory:
+                    profiler.memory_grew(self.steps, ip, self.peak_memory)
+                ip = next_ip
+                if stop:
+                    if stop == HALT:
+                        self.halted = True
+                        raise StopIteration
+                    if stop_on_output:
+                        return self.outputs[-1]
+        finally:
+            self.ip = ip
+            profiler.wall_time += time.perf_counter() - start
+
+    def _execute_traced(self, stop_on_output=True):
+        """Run the virtual machine until it produces its next output (unless stop_on_output is
+        false) or needs input, reporting inputs, outputs and checkpoints to the tracer. Instructions
+        are executed with the TABLE engine's handlers."""
+        tracer = self.tracer
+        mem = self.memory
+        code = self._traced
+        ip = self.ip
+        steps = self.steps
+        next_checkpoint = tracer.next_checkpoint
+        try:
+            while True:
+                if steps >= next_checkpoint:
+                    self.ip, self.steps = ip, steps
+                    tracer.checkpoint(self)
+                    next_checkpoint = tracer.next_checkpoint
+                try:
+                    handler, event = code[ip]
+                except KeyError:
+                    opcode, modes = self.decode(ip)
+                    handler = build_handler(opcode, modes)
+                    event = opcode if opcode in (INPUT, OUTPUT, HALT) else 0
+                    code[ip] = handler, event
+                if event == INPUT and self.inputs:
+                    value = self.inputs[0]
+                try:
+                    next_ip = handler(self, mem, code, ip)
+                except IndexError:
+                    if self._grow_for(ip):
+                        continue
+                    if not self.inputs and event == INPUT:
+                        return NEEDS_INPUT
+                    raise
+                steps += 1
+                ip = next_ip
+                if event:
+                    if event == HALT:
+                        self.halted = True
+                        raise StopIteration
+                    if event == INPUT:
+                        tracer.input(steps - 1, value)
+                    else:
+                        tracer.output(steps - 1, self.outputs[-1])
+                    next_checkpoint = tracer.next_checkpoint
+                    if event == OUTPUT and stop_on_output:
+                        return self.outputs[-1]
+        finally:
+            self.ip = ip
+            self.steps = steps
@@ -0,0 +1,34 @@
+"""Drive IntcodeVMs from asyncio code, with asyncio.Queue channels for their input and output."""
+import asyncio
+
+from Intcode import HALTED, IntcodeVM
+
+
+class AsyncIntcodeVM:
+    """Run an IntcodeVM as an asyncio task, reading its input from one asyncio.Queue and writing its
+    output to another. Several of these can be composed by sharing queues, or fed by any other
+    producer and consumer.
+
+    The VM runs until it halts or needs input before awaiting anything, so many instructions are
+    executed between awaits. It does not yield to the event loop while it is computing, so
+    programs that run for a long time without using their input will hold up other tasks."""
+    def __init__(self, vm: IntcodeVM, inputs: asyncio.Queue = None, outputs: asyncio.Queue = None):
+        self.vm = vm
+        self.inputs = inputs if inputs is not None else asyncio.Queue()
+        self.outputs = outputs if outputs is not None else asyncio.Queue()
+
+    async def run(self):
+        """Run the VM until it halts, awaiting input from the input queue whenever it needs more.
+        Every output is put on the output queue as soon as the VM stops to wait or halt, and is not
+        kept in the VM's own output list."""
+        vm = self.vm
+        while True:
+            state = vm.resume()
+            for value in vm.outputs:
+                await self.outputs.put(value)
+            del vm.outputs[:]
+            if state is HALTED:
+                return
+            vm.add_input(await self.inputs.get())
+            while not self.inputs.empty():  # take everything else that is already waiting
+                vm.add_input(self.inputs.get_nowait())
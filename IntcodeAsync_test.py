@@ -0,0 +1,36 @@
+"""Tests for the AsyncIntcodeVM class in IntcodeAsync.py"""
+import asyncio
+
+from Intcode import IntcodeVM
+from IntcodeAsync import AsyncIntcodeVM
+
+# day 7 example: amplifier program for a feedback loop
+FEEDBACK_AMPLIFIER = [3, 26, 1001, 26, -4, 26, 3, 27, 1002, 27, 2, 27, 1, 27, 26, 27, 4, 27, 1001,
+                      28, -1, 28, 1005, 28, 6, 99, 0, 0, 5]
+
+
+def test_feeds_queues():
+    async def run():
+        # output 1 if input equals 8, otherwise 0
+        vm = AsyncIntcodeVM(IntcodeVM([3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8], []))
+        task = asyncio.create_task(vm.run())
+        await vm.inputs.put(8)
+        result = await vm.outputs.get()
+        await task
+        return result
+
+    assert asyncio.run(run()) == 1
+
+
+def test_feedback_loop():
+    async def run():
+        queues = [asyncio.Queue() for _ in range(5)]
+        amps = []
+        for num, phase in enumerate([9, 8, 7, 6, 5]):
+            vm = IntcodeVM(list(FEEDBACK_AMPLIFIER), [phase])
+            amps.append(AsyncIntcodeVM(vm, queues[num], queues[(num + 1) % 5]))
+        await queues[0].put(0)
+        await asyncio.gather(*(amp.run() for amp in amps))
+        return queues[0].get_nowait()  # Amp E's last output went back towards Amp A
+
+    assert asyncio.run(run()) == 139629729
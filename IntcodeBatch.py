@@ -0,0 +1,137 @@
+"""Run many instances of an Intcode program in lock-step, with their state held in NumPy arrays.
+
+Instances that are at the same address and about to run the same instruction execute it together,
+as one vectorised step over all of them. Instances only split into separate groups where their
+control flow (or their code) diverges, so parameter sweeps that change a few memory cells of the
+same program run as a handful of NumPy operations per instruction instead of one interpreter per
+instance.
+
+Memory cells are signed 64-bit integers, which wrap around on overflow instead of growing like
+Python ints."""
+from collections import deque
+from typing import Iterable, List, Sequence
+
+import numpy as np
+
+from Intcode import (ADD, EQUALS, HALT, IMMEDIATE, INPUT, InputExhausted, JUMPIFFALSE, JUMPIFTRUE,
+                     LESSTHAN, MULTIPLY, OUTPUT, POSITION, RELATIVE, SETRELATIVEBASE,
+                     decode_instruction)
+
+
+class IntcodeBatch:
+    """A batch of count instances of the same program. Before running the batch, the instances can
+    be given different memory (through the memory matrix, one row per instance) and inputs.
+
+    memory: the memory of every instance, one row per instance
+    ip: the instruction pointer of every instance
+    relativebase: the relative base of every instance
+    halted: whether each instance has halted
+    steps: the number of instructions each instance has executed
+    outputs: the output list of every instance"""
+    def __init__(self, program: Sequence[int], count: int,
+                 inputs: Iterable[Iterable[int]] = None):
+        self.memory = np.tile(np.array(program, dtype=np.int64), (count, 1))
+        self.ip = np.zeros(count, dtype=np.int64)
+        self.relativebase = np.zeros(count, dtype=np.int64)
+        self.halted = np.zeros(count, dtype=bool)
+        self.steps = np.zeros(count, dtype=np.int64)
+        if inputs is None:
+            self.inputs = [deque() for _ in range(count)]
+        else:
+            self.inputs = [deque(values) for values in inputs]
+        self.outputs: List[List[int]] = [[] for _ in range(count)]
+        self.vector_steps = 0  # number of group instructions executed
+
+    def _ensure(self, addrs: np.ndarray):
+        """Grow every instance's memory so that it includes all of the given addresses."""
+        if addrs.size == 0:
+            return
+        if addrs.min() < 0:
+            raise IndexError('Intcode memory address out of range')
+        highest = int(addrs.max())
+        columns = self.memory.shape[1]
+        if highest >= columns:
+            extra = max(highest + 1, 2 * columns) - columns
+            self.memory = np.hstack([self.memory,
+                                     np.zeros((self.memory.shape[0], extra), dtype=np.int64)])
+
+    def _groups(self, rows: np.ndarray):
+        """Split the given instances into groups at the same address with the same instruction
+        there, and yield (address, instruction, rows) for each group."""
+        ips = self.ip[rows]
+        self._ensure(ips)
+        instructions = self.memory[rows, ips]
+        if (ips == ips[0]).all() and (instructions == instructions[0]).all():
+            yield int(ips[0]), int(instructions[0]), rows
+            return
+        order = np.lexsort((instructions, ips))
+        ips, instructions, rows = ips[order], instructions[order], rows[order]
+        splits = np.flatnonzero((ips[1:] != ips[:-1]) | (instructions[1:] != instructions[:-1]))
+        for group in np.split(np.arange(len(rows)), splits + 1):
+            yield int(ips[group[0]]), int(instructions[group[0]]), rows[group]
+
+    def _execute(self, addr: int, instruction: int, rows: np.ndarray):
+        """Execute the instruction at addr for the given instances, all at once."""
+        opcode, modes = decode_instruction(instruction)
+        self._ensure(np.array([addr + len(modes)]))
+        mem = self.memory
+        raw = mem[rows, addr + 1:addr + 1 + len(modes)]  # one column per parameter
+        targets = []  # the addresses each parameter points at
+        for num, mode in enumerate(modes):
+            if mode == RELATIVE:
+                targets.append(self.relativebase[rows] + raw[:, num])
+            else:  # writes ignore IMMEDIATE and treat it as POSITION
+                targets.append(raw[:, num])
+        values = []
+        for num, mode in enumerate(modes):
+            if mode == IMMEDIATE:
+                values.append(raw[:, num])
+            elif mode in (POSITION, RELATIVE):
+                self._ensure(targets[num])
+                values.append(self.memory[rows, targets[num]])
+            else:
+                raise ValueError(f'Unknown parameter mode {mode} at address {addr}')
+        if opcode in (ADD, MULTIPLY, LESSTHAN, EQUALS, INPUT):
+            self._ensure(targets[-1])
+        mem = self.memory  # may have grown
+        next_ip = addr + len(modes) + 1
+        self.ip[rows] = next_ip
+        if opcode == ADD:
+            mem[rows, targets[2]] = values[0] + values[1]
+        elif opcode == MULTIPLY:
+            mem[rows, targets[2]] = values[0] * values[1]
+        elif opcode == LESSTHAN:
+            mem[rows, targets[2]] = values[0] < values[1]
+        elif opcode == EQUALS:
+            mem[rows, targets[2]] = values[0] == values[1]
+        elif opcode == JUMPIFTRUE:
+            self.ip[rows] = np.where(values[0] != 0, values[1], next_ip)
+        elif opcode == JUMPIFFALSE:
+            self.ip[rows] = np.where(values[0] == 0, values[1], next_ip)
+        elif opcode == SETRELATIVEBASE:
+            self.relativebase[rows] += values[0]
+        elif opcode == INPUT:
+            for row in rows:
+                if not self.inputs[row]:
+                    self.ip[rows] = addr
+                    raise InputExhausted(f'Instance {row} needs input at address {addr}')
+            for row, target in zip(rows, targets[0]):
+                mem[row, target] = self.inputs[row].popleft()
+        elif opcode == OUTPUT:
+            for row, value in zip(rows, values[0]):
+                self.outputs[row].append(int(value))
+        elif opcode == HALT:
+            self.ip[rows] = addr
+            self.halted[rows] = True
+        self.steps[rows] += 1
+        self.vector_steps += 1
+
+    def run(self) -> List[List[int]]:
+        """Run every instance until it halts, then return their output lists. Raise InputExhausted
+        if an instance runs out of input first."""
+        while True:
+            rows = np.flatnonzero(~self.halted)
+            if rows.size == 0:
+                return self.outputs
+            for addr, instruction, group in self._groups(rows):
+                self._execute(addr, instruction, group)
@@ -0,0 +1,53 @@
+"""Tests for the IntcodeBatch class in IntcodeBatch.py"""
+import itertools
+
+import numpy as np
+import pytest
+
+from Intcode import InputExhausted, IntcodeVM
+from IntcodeBatch import IntcodeBatch
+from Intcode_test import TESTS
+
+
+@pytest.mark.parametrize('program,want_memory,inputs,want_outputs', TESTS)
+def test_batch(program, want_memory, inputs, want_outputs):
+    batch = IntcodeBatch(program, 3, [inputs] * 3)
+    assert batch.run() == [want_outputs] * 3
+    for memory in batch.memory:
+        assert list(memory[:len(want_memory)]) == want_memory
+        assert not memory[len(want_memory):].any()
+
+
+def test_divergent_control_flow():
+    # day 5 example: output 999 if input below 8, 1000 if input equal to 8, 1001 if above
+    program = TESTS[24][0]
+    batch = IntcodeBatch(program, 3, [[7], [8], [9]])
+    assert batch.run() == [[999], [1000], [1001]]
+    for num, value in enumerate([7, 8, 9]):
+        vm = IntcodeVM(list(program), [value])
+        vm.run()
+        assert list(batch.memory[num]) == vm.memory
+        assert batch.steps[num] == vm.steps
+
+
+def test_noun_verb_sweep():
+    with open('day2.input', 'r') as f:
+        program = [int(val) for val in f.read().split(',')]
+    noun_verbs = list(itertools.product(range(10), repeat=2))
+    batch = IntcodeBatch(program, len(noun_verbs))
+    batch.memory[:, 1:3] = np.array(noun_verbs)
+    batch.run()
+    for (noun, verb), result in zip(noun_verbs, batch.memory[:, 0]):
+        vm = IntcodeVM(list(program), [])
+        vm.write(noun, 1)
+        vm.write(verb, 2)
+        vm.run()
+        assert result == vm.memory[0]
+    # every instance runs the same instructions, so they all ran in lock-step
+    assert batch.vector_steps == batch.steps[0]
+
+
+def test_input_exhausted():
+    batch = IntcodeBatch([3, 0, 99], 2, [[1], []])
+    with pytest.raises(InputExhausted):
+        batch.run()
@@ -0,0 +1,88 @@
+"""Memoise the results of running Intcode programs, in memory and optionally on disk."""
+import hashlib
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from Intcode import IntcodeVM
+
+
+class IntcodeResult(NamedTuple):
+    """The outputs of a program that ran to completion, and its memory when it halted."""
+    outputs: Tuple[int, ...]
+    memory: Tuple[int, ...]
+
+
+def program_hash(program: Iterable[int]) -> str:
+    """Return a hash identifying the given program."""
+    return hashlib.sha256(','.join(str(val) for val in program).encode()).hexdigest()
+
+
+class IntcodeResultCache:
+    """A cache of program results keyed by (program hash, initial inputs), with two tiers: an
+    in-process tier holding the maxsize most recently used results, and an optional on-disk tier,
+    an sqlite database in cache_dir, which is shared by every process using the same directory.
+
+    The hits, disk_hits and misses counters record how each lookup was answered."""
+    def __init__(self, maxsize: int = 1024, cache_dir: str = None):
+        self.maxsize = maxsize
+        self._results = OrderedDict()  # least recently used first
+        self._db = None
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(cache_dir, 'intcode_results.sqlite3'))
+            self._db.execute('CREATE TABLE IF NOT EXISTS results '
+                             '(key TEXT PRIMARY KEY, outputs TEXT, memory TEXT)')
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def run(self, program: List[int], inputs: Iterable[int] = (), **vm_options) -> IntcodeResult:
+        """Return the result of running a copy of the program with the given inputs, running it
+        only if the result is not cached yet. Options are passed on to IntcodeVM()."""
+        inputs = tuple(inputs)
+        key = f'{program_hash(program)}:{",".join(str(val) for val in inputs)}'
+        try:
+            result = self._results[key]
+        except KeyError:
+            pass
+        else:
+            self._results.move_to_end(key)
+            self.hits += 1
+            return result
+        result = self._load(key)
+        if result is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            vm = IntcodeVM(list(program), inputs, **vm_options)
+            vm.run()
+            result = IntcodeResult(tuple(vm.outputs), tuple(vm.memory))
+            self._store(key, result)
+        self._results[key] = result
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+        return result
+
+    def _load(self, key: str) -> Optional[IntcodeResult]:
+        if self._db is None:
+            return None
+        row = self._db.execute('SELECT outputs, memory FROM results WHERE key = ?',
+                               (key,)).fetchone()
+        if row is None:
+            return None
+        return IntcodeResult(*(tuple(int(val) for val in field.split(',') if val) for field in row))
+
+    def _store(self, key: str, result: IntcodeResult):
+        if self._db is None:
+            return
+        with self._db:
+            self._db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?)',
+                             (key, *(','.join(str(val) for val in field) for field in result)))
+
+    def close(self):
+        """Close the on-disk tier, if there is one."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
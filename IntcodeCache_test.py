@@ -0,0 +1,35 @@
+"""Tests for the IntcodeResultCache class in IntcodeCache.py"""
+from IntcodeCache import IntcodeResultCache, program_hash
+
+# output 1 if input equals 8, otherwise 0 (position mode)
+EQUALS_8 = [3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8]
+
+
+def test_memory_tier():
+    cache = IntcodeResultCache(maxsize=2)
+    assert cache.run(EQUALS_8, [8]).outputs == (1,)
+    assert cache.run(EQUALS_8, [8]).outputs == (1,)
+    assert cache.run(EQUALS_8, [7]).outputs == (0,)
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert EQUALS_8[9] == -1  # the program itself is not modified
+    cache.run(EQUALS_8, [9])  # evicts the least recently used result, for input 8
+    cache.run(EQUALS_8, [7])
+    cache.run(EQUALS_8, [8])
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_disk_tier(tmp_path):
+    cache = IntcodeResultCache(cache_dir=str(tmp_path))
+    first = cache.run(EQUALS_8, [8])
+    cache.close()
+    cache = IntcodeResultCache(cache_dir=str(tmp_path))  # e.g. another job
+    assert cache.run(EQUALS_8, [8]) == first
+    assert first.memory == (3, 9, 8, 9, 10, 9, 4, 9, 99, 1, 8)
+    assert (cache.hits, cache.disk_hits, cache.misses) == (0, 1, 0)
+    cache.run(EQUALS_8, [8])
+    assert cache.hits == 1
+
+
+def test_program_hash():
+    assert program_hash([1, 0, 0, 0, 99]) == program_hash((1, 0, 0, 0, 99))
+    assert program_hash([1, 0, 0, 0, 99]) != program_hash([1, 0, 0, 3, 99])
@@ -0,0 +1,359 @@
+"""Compile Intcode programs to Python functions, one per basic block, as they run.
+
+A basic block is a run of instructions that ends at a jump, or before an INPUT, OUTPUT or HALT
+instruction. Its parameter modes and immediate values are folded into the generated Python source
+as constants, and the relative base is kept in a local variable. Instructions the compiler does not
+handle are executed one at a time by the interpreter (the table engine's handlers), which also
+takes over whenever an instruction would reach past the end of memory.
+
+Because a compiled block assumes its code does not change, writing to any address covered by a
+compiled block discards that block. The write happens, the current block stops right after the
+writing instruction, and the code is compiled again from its new contents once it is hot again."""
+import functools
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from Intcode import (ADD, EQUALS, HALT, IMMEDIATE, INPUT, IntcodeVM, JUMPIFFALSE, JUMPIFTRUE,
+                     LESSTHAN, MULTIPLY, NEEDS_INPUT, OUTPUT, POSITION, PagedMemory, RELATIVE,
+                     SETRELATIVEBASE, TABLE, build_handler, decode_instruction)
+
+# the longest run of instructions compiled into one block
+MAX_BLOCK_LENGTH = 100
+
+# a VM compiles a block once it has reached the block's start address this many times, unless the
+# block was already compiled (by any VM); until then its instructions are interpreted. Code that
+# only runs once, or that the program keeps writing over, is not worth compiling.
+COMPILE_THRESHOLD = 2
+# once the blocks compiled from an address have been discarded this many times (by writes to the
+# code they cover), the VM interprets the instruction there instead of compiling it again. Loops
+# that rewrite their own parameters on every trip would otherwise be compiled on every trip.
+DISCARD_LIMIT = 3
+# the most compiled blocks kept in the cache shared by all VMs; the least recently used are dropped
+CACHE_SIZE = 4096
+
+# Python expressions for the value written by each instruction compiled into a block, and Python
+# source for the other instructions compiled into a block. {pN} is replaced by an expression for the
+# value of parameter N and {next} by the address of the following instruction.
+WRITE_TEMPLATES = {
+    ADD: '{p1} + {p2}',
+    MULTIPLY: '{p1} * {p2}',
+    LESSTHAN: '1 if {p1} < {p2} else 0',
+    EQUALS: '1 if {p1} == {p2} else 0',
+}
+INSTRUCTION_TEMPLATES = {
+    SETRELATIVEBASE: 'rb += {p1}',
+    JUMPIFTRUE: 'return ({p2} if {p1} != 0 else {next}), rb',
+    JUMPIFFALSE: 'return ({p2} if {p1} == 0 else {next}), rb',
+}
+# Python source for the condition of a jump back to the start of its own block
+LOOP_TEMPLATES = {
+    JUMPIFTRUE: 'if {p1} != 0:',
+    JUMPIFFALSE: 'if {p1} == 0:',
+}
+
+# compiled blocks keyed by their start address and the contents of the memory they cover, as
+# (highest, block) pairs where highest is the highest constant address the block accesses, so that
+# VMs running the same program (such as forks) compile each block only once. Ordered from least to
+# most recently used.
+_compiled_blocks: 'OrderedDict[Tuple[int, tuple], Tuple[int, Callable]]' = OrderedDict()
+# the ends of the blocks in _compiled_blocks from each start address, with the number of blocks
+# ending there
+_block_ends: Dict[int, Counter] = {}
+
+_decode = functools.lru_cache(maxsize=None)(decode_instruction)
+
+
+class CodeMap(dict):
+    """Maps every address covered by a compiled block to a tuple of the start addresses of the
+    blocks covering it. Deleting an address, as the interpreter's handlers and compiled blocks do
+    when they write to it, discards every block covering that address."""
+    def __init__(self):
+        super().__init__()
+        self.blocks: Dict[int, Callable] = {}  # compiled blocks, keyed by start address
+        self._ends: Dict[int, int] = {}  # the address just past the end of each block
+        self.discards: Dict[int, int] = {}  # the number of blocks discarded, by start address
+
+    def add(self, start: int, end: int, block: Callable):
+        self.blocks[start] = block
+        self._ends[start] = end
+        for addr in range(start, end):
+            self[addr] = self.get(addr, ()) + (start,)
+
+    def copy(self) -> 'CodeMap':
+        """Return a copy of the map, for a forked VM. The tuples of start addresses are shared,
+        since they are replaced rather than modified."""
+        copied = CodeMap()
+        copied.update(self)
+        copied.blocks = dict(self.blocks)
+        copied._ends = dict(self._ends)
+        copied.discards = dict(self.discards)
+        return copied
+
+    def __delitem__(self, addr: int):
+        for start in self.pop(addr):
+            if self.blocks.pop(start) is not None:
+                self.discards[start] = self.discards.get(start, 0) + 1
+            for other in range(start, self._ends.pop(start)):
+                if other != addr:
+                    starts = tuple(other_start for other_start in self[other]
+                                   if other_start != start)
+                    if starts:
+                        self[other] = starts
+                    else:
+                        super().__delitem__(other)
+
+
+def compile_block(memory, start: int) -> Optional[tuple]:
+    """Compile the basic block starting at the given address of memory. Return (end, block) where
+    end is the address just past the block and block is the compiled function, or None if the
+    instruction at start cannot be compiled."""
+    cached = cached_block(memory, start)
+    if cached is not None:
+        return cached
+    lines = []
+    addr = start
+    count = 0
+    cells = []
+    ended = False  # whether the block ends with a jump
+    loops = False  # whether the block ends with a jump back to its start
+    written = set()  # constant addresses ahead of the block written to by its instructions
+    highest = -1  # the highest constant address accessed by the block's instructions
+    while count < MAX_BLOCK_LENGTH:
+        try:
+            instruction = memory[addr]
+            opcode, modes = _decode(instruction)
+            values = [memory[addr + num] for num in range(1, len(modes) + 1)]
+        except (IndexError, KeyError):  # not an instruction, or past the end of memory
+            break
+        if opcode not in WRITE_TEMPLATES and opcode not in INSTRUCTION_TEMPLATES:
+            break
+        nxt = addr + len(modes) + 1
+        if written.intersection(range(addr, nxt)):
+            break  # an earlier instruction of the block writes over this one
+        if any(mode not in (POSITION, IMMEDIATE, RELATIVE) for mode in modes):
+            break
+        # addresses of memory the instruction accesses, as far as they are known now
+        addresses = [value for mode, value in zip(modes, values) if mode == POSITION]
+        if opcode in WRITE_TEMPLATES and modes[2] == IMMEDIATE:
+            addresses.append(values[2])  # writes ignore IMMEDIATE and treat it as POSITION
+        if any(address >= len(memory) for address in addresses):
+            break  # leave growing memory to the interpreter
+        jump = opcode in (JUMPIFTRUE, JUMPIFFALSE)
+        if jump and modes[1] == IMMEDIATE:
+            addresses_and_target = addresses + [values[1]]
+        else:
+            addresses_and_target = addresses
+        if any(address < 0 for address in addresses_and_target):
+            break  # and leave negative addresses to the interpreter to reject
+        highest = max([highest] + addresses)
+        params = {'next': nxt}
+        targets = []  # expression for the address each parameter points at
+        offsets = []
+        for num, (mode, value) in enumerate(zip(modes, values), start=1):
+            if mode == RELATIVE:
+                targets.append(f'rb + {value}')
+                params[f'p{num}'] = f'mem[rb + {value}]'
+                offsets.append(value)
+            else:
+                targets.append(f'{value}')
+                params[f'p{num}'] = f'{value}' if mode == IMMEDIATE else f'mem[{value}]'
+        guards = []
+        if offsets:
+            guards.append(f'rb + {max(offsets)} >= len(mem) or rb + {min(offsets)} < 0')
+        if jump and modes[1] != IMMEDIATE:
+            guards.append(f'{params["p2"]} < 0')
+        if guards:
+            # let the interpreter run this instruction if it would reach past the end of memory, or
+            # to a negative address (which the negative addresses returned by blocks stand for)
+            lines.append(f'if {" or ".join(guards)}:')
+            lines.append(f'    vm.steps += STEPS{count}')
+            lines.append(f'    return {-addr - 1}, rb')
+        count += 1
+        cells.extend([instruction] + values)
+        target = None if opcode not in WRITE_TEMPLATES or modes[2] == RELATIVE else values[2]
+        addr = nxt
+        if opcode in WRITE_TEMPLATES:
+            lines.append(f't = {targets[-1]}')
+            lines.append(f'mem[t] = {WRITE_TEMPLATES[opcode].format(**params)}')
+            # stop if the instruction wrote over compiled code
+            lines.append('if t in code:')
+            lines.append('    del code[t]')
+            lines.append(f'    vm.steps += STEPS{count}')
+            lines.append(f'    return {nxt}, rb')
+            if target is not None:
+                if start <= target < nxt:
+                    break  # the instruction writes over the block: end the block with it
+                written.add(target)
+        elif opcode in (JUMPIFTRUE, JUMPIFFALSE):
+            if modes[1] == IMMEDIATE and values[1] == start:
+                # a loop around this block: run it inside the compiled function
+                loops = True
+                lines.append(LOOP_TEMPLATES[opcode].format(**params))
+                lines.append(f'    steps += {count}')
+                lines.append('    continue')
+                lines.append(f'vm.steps += STEPS{count}')
+                lines.append(f'return {nxt}, rb')
+            else:
+                lines.append(f'vm.steps += STEPS{count}')
+                lines.append(INSTRUCTION_TEMPLATES[opcode].format(**params))
+            ended = True
+            break
+        else:
+            lines.append(INSTRUCTION_TEMPLATES[opcode].format(**params))
+    if count == 0:
+        return None
+    if not ended:
+        lines.append(f'vm.steps += STEPS{count}')
+        lines.append(f'return {addr}, rb')
+    if loops:  # count the instructions run by earlier trips around the loop too
+        body = '\n        '.join(lines).replace('STEPS', 'steps + ')
+        body = f'steps = 0\n    while True:\n        {body}'
+    else:
+        body = '\n    '.join(lines).replace('STEPS', '')
+    namespace = {}
+    exec(compile(f'def block(vm, mem, code, rb):\n    {body}\n', f'<intcode block {start}>',
+                 'exec'), namespace)
+    block = namespace['block']
+    _compiled_blocks[start, tuple(cells)] = highest, block
+    _block_ends.setdefault(start, Counter())[addr] += 1
+    while len(_compiled_blocks) > CACHE_SIZE:
+        (old_start, old_cells), _ = _compiled_blocks.popitem(last=False)
+        ends = _block_ends[old_start]
+        ends[old_start + len(old_cells)] -= 1
+        if not ends[old_start + len(old_cells)]:
+            del ends[old_start + len(old_cells)]
+            if not ends:
+                del _block_ends[old_start]
+    return addr, block
+
+
+def cached_block(memory, start: int) -> Optional[tuple]:
+    """Return (end, block) for a block already compiled from the same contents of memory at the
+    given address, or None if there is none."""
+    for end in _block_ends.get(start, ()):
+        key = start, _cells(memory, start, end)
+        try:
+            highest, block = _compiled_blocks[key]
+        except KeyError:
+            continue
+        if highest < len(memory):
+            _compiled_blocks.move_to_end(key)
+            return end, block
+    return None
+
+
+def _cells(memory, start: int, end: int) -> tuple:
+    """Return the contents of memory from start up to end."""
+    if isinstance(memory, PagedMemory):  # which does not support slices
+        return tuple(memory[addr] for addr in range(start, end))
+    return tuple(memory[start:end])
+
+
+class CompiledIntcodeVM(IntcodeVM):
+    """An IntcodeVM that compiles its program's basic blocks to Python functions as it reaches them,
+    falling back to the table engine's handlers for the instructions it does not compile. Results
+    are identical to IntcodeVM's.
+
+    A VM given a profiler or a tracer reports every instruction to it, so it runs them one at a time
+    like an IntcodeVM, without compiling anything. The engine option is accepted like IntcodeVM's,
+    but has no effect: instructions that are not compiled always run on the table engine's
+    handlers."""
+    def __init__(self, memory: List[int], inputs, outputs: list = None, decode_cache: bool = True,
+                 engine: str = TABLE, profiler=None, tracer=None):
+        super().__init__(memory, inputs, outputs, decode_cache=decode_cache, engine=engine,
+                         profiler=profiler, tracer=tracer)
+        # compiled blocks and the table engine's handlers only drop the code map's entries for the
+        # addresses they write to, so the ladder engine's decoded instructions would go stale
+        self._decoded = None
+        self._code = CodeMap()
+        self._visits: Dict[int, int] = {}  # times each address not yet compiled was reached
+        if profiler is None and tracer is None:
+            self._execute = self._execute_compiled
+
+    def write(self, val, addr, mode=POSITION):
+        """Write val to memory at the given address, using the given mode, discarding any compiled
+        block covering that address."""
+        super().write(val, addr, mode)
+        if mode == RELATIVE:
+            addr += self.relativebase
+        if addr in self._code:
+            del self._code[addr]
+
+    def fork(self) -> 'CompiledIntcodeVM':
+        """Return a new VM with the same state as this one (see IntcodeVM.fork()), which starts with
+        every block this one has compiled."""
+        forked = super().fork()
+        forked._code = self._code.copy()
+        return forked
+
+    def _compile(self, start: int) -> Optional[Callable]:
+        """Return the block starting at the given address, compiling it if it is hot enough, or
+        None if the instruction there should be interpreted."""
+        if self._code.discards.get(start, 0) >= DISCARD_LIMIT:
+            # the program keeps writing over the code here: interpret it (until written over)
+            self._code.add(start, start + 1, None)
+            return None
+        compiled = cached_block(self.memory, start)
+        if compiled is None:
+            visits = self._visits[start] = self._visits.get(start, 0) + 1
+            if visits < COMPILE_THRESHOLD:
+                return None
+            compiled = compile_block(self.memory, start)
+        if compiled is None:
+            try:
+                opcode, _ = self.decode(start)
+            except (IndexError, KeyError):
+                return None
+            if opcode not in WRITE_TEMPLATES and opcode not in INSTRUCTION_TEMPLATES:
+                # never compilable (until written over): do not try again
+                self._code.add(start, start + 1, None)
+            return None
+        end, block = compiled
+        self._code.add(start, end, block)
+        return block
+
+    def _execute_compiled(self, stop_on_output=True):
+        """Run the virtual machine until it produces its next output (unless stop_on_output is
+        false) or needs input, running compiled blocks wherever possible."""
+        mem = self.memory
+        code = self._code
+        blocks = code.blocks
+        ip = self.ip
+        rb = self.relativebase
+        try:
+            while True:
+                if ip >= 0:
+                    try:
+                        block = blocks[ip]
+                    except KeyError:
+                        block = self._compile(ip)
+                    if block is not None:
+                        ip, rb = block(self, mem, code, rb)
+                        continue
+                else:  # a block asked for this instruction to be interpreted
+                    ip = -ip - 1
+                # interpret a single instruction
+                self.relativebase = rb
+                opcode, modes = self.decode(ip)
+                handler = build_handler(opcode, modes)
+                try:
+                    next_ip = handler(self, mem, code, ip)
+                except IndexError:
+                    if self._grow_for(ip):
+                        continue
+                    if not self.inputs and opcode == INPUT:
+                        return NEEDS_INPUT
+                    raise
+                self.steps += 1
+                rb = self.relativebase
+                if next_ip < 0:  # a jump to a negative address
+                    raise IndexError('Intcode memory address out of range')
+                if opcode == HALT:
+                    self.halted = True
+                    raise StopIteration
+                ip = next_ip
+                if opcode == OUTPUT and stop_on_output:
+                    return self.outputs[-1]
+        finally:
+            self.ip = ip
+            self.relativebase = rb
@@ -0,0 +1,176 @@
+"""Tests for the CompiledIntcodeVM class in IntcodeCompiler.py"""
+import pytest
+
+import IntcodeCompiler
+from Intcode import DenseMemory, IntcodeVM, LADDER, NEEDS_INPUT, PagedMemory, TABLE
+from IntcodeCompiler import DISCARD_LIMIT, CompiledIntcodeVM
+from IntcodeProfiler import IntcodeProfiler
+from IntcodeTracer import IntcodeTrace, IntcodeTracer
+from Intcode_test import NEGATIVE_ADDRESS_TESTS, TESTS
+
+
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+@pytest.mark.parametrize('memory_type', [list, DenseMemory, PagedMemory])
+@pytest.mark.parametrize('program,want_memory,inputs,want_outputs', TESTS)
+def test_compiled_vm(program, want_memory, inputs, want_outputs, memory_type, engine):
+    vm = CompiledIntcodeVM(memory_type(program), inputs, engine=engine)
+    assert vm.run() == want_outputs
+    memory = list(vm.memory)
+    assert memory[:len(want_memory)] == want_memory
+    assert not any(memory[len(want_memory):])
+
+
+@pytest.mark.parametrize('memory_type', [list, DenseMemory, PagedMemory])
+@pytest.mark.parametrize('program,inputs', NEGATIVE_ADDRESS_TESTS + [
+    # move the relative base down by one on every trip around a loop reading from it, so that the
+    # loop is compiled before its read reaches address -1
+    [[109, 5, 109, -1, 2101, 0, 0, 30, 1105, 1, 2, 99] + [0] * 20, []],
+    # count address 30 down from 5 to zero, jumping back to the start while it is nonzero and to
+    # address -5 once it is zero
+    [[1001, 30, -1, 30, 1008, 30, 0, 31, 1002, 31, -5, 31, 5, 32, 31, 99] + [0] * 14 + [5, 0, 1],
+     []],
+])
+def test_negative_address(program, inputs, memory_type):
+    want = IntcodeVM(memory_type(program), list(inputs))
+    with pytest.raises(IndexError):
+        want.run()
+    vm = CompiledIntcodeVM(memory_type(program), list(inputs))
+    with pytest.raises(IndexError):
+        vm.run()
+    assert list(vm.memory) == list(want.memory)
+
+
+def test_loop():
+    # decrement the counter at address 8 from 1000 to zero, then halt
+    program = [1001, 8, -1, 8, 1005, 8, 0, 99, 1000]
+    vm = CompiledIntcodeVM(list(program), [])
+    vm.run()
+    assert vm.memory[8] == 0
+    assert vm.steps == 2001
+
+
+def test_write_into_compiled_code():
+    # count address 25 down from 3 to zero, then overwrite the jump back at address 7 with HALT,
+    # reset the counter and start again, halting after one more trip
+    program = [1001, 25, -1, 25,
+               1006, 25, 10,
+               1105, 1, 0,
+               1101, 99, 0, 7,
+               1101, 3, 0, 25,
+               1105, 1, 0,
+               0, 0, 0, 0,
+               3]
+    vm = CompiledIntcodeVM(list(program), [])
+    want = IntcodeVM(list(program), [])
+    vm.run()
+    want.run()
+    assert vm.memory == want.memory
+    assert vm.memory[25] == 2
+    assert vm.steps == want.steps
+
+
+def test_self_modifying_block():
+    # the first instruction overwrites the second one (an ADD) with a MULTIPLY before it runs
+    program = [1101, 2, 0, 4, 1, 11, 12, 13, 4, 13, 99, 6, 7, 0]
+    vm = CompiledIntcodeVM(list(program), [])
+    assert vm.run() == IntcodeVM(list(program), []).run() == [42]
+
+
+def test_fork_inherits_compiled_blocks():
+    # add the inputs up at address 12 until a zero is input, then output the sum
+    program = [3, 13, 1, 12, 13, 12, 1005, 13, 0, 4, 12, 99, 0, 0]
+    vm = CompiledIntcodeVM(list(program), [1, 2, 3])
+    assert vm.resume() == NEEDS_INPUT
+    forked = vm.fork()
+    assert 2 in vm._code.blocks
+    assert forked._code.blocks == vm._code.blocks
+    forked.write(12, 4)  # double the sum instead of adding the input
+    forked.add_input(0)
+    assert forked.run() == [12]
+    # the parent's compiled code is untouched
+    assert 2 in vm._code.blocks
+    vm.add_input(0)
+    assert vm.run() == [6]
+
+
+def test_write_from_outside():
+    # add 1 to each input and output it; the host then changes the increment, at address 4
+    program = [3, 20, 1001, 20, 1, 20, 4, 20, 1105, 1, 0, 99] + [0] * 10
+    for vm in (CompiledIntcodeVM(list(program), [5]), IntcodeVM(list(program), [5])):
+        vm.resume()
+        vm.write(100, 4)
+        vm.add_input(5)
+        vm.resume()
+        assert vm.outputs == [6, 105]
+
+
+def pointer_walk(count):
+    """Return a program that adds up the count cells from address 100 and outputs the sum. It
+    moves the pointer parameter of its ADD instruction along on every trip around the loop."""
+    program = [1, 50, 100, 50,  # add the cell the pointer at address 2 points at to address 50
+               1001, 2, 1, 2,  # move the pointer along
+               1001, 51, -1, 51,  # count address 51 down to zero, looping back while it is nonzero
+               1005, 51, 0,
+               4, 50, 99]
+    return program + [0] * (50 - len(program)) + [0, count] + [0] * 48 + list(range(count))
+
+
+def test_loop_rewriting_its_own_parameters():
+    cached = len(IntcodeCompiler._compiled_blocks)
+    program = pointer_walk(5000)
+    want = IntcodeVM(list(program), [])
+    vm = CompiledIntcodeVM(list(program), [])
+    assert vm.run() == want.run() == [sum(range(5000))]
+    assert vm.steps == want.steps == 4 * 5000 + 2
+    # the ADD is compiled a few times before the VM gives up on it, rather than once per trip
+    assert vm._code.discards[0] == DISCARD_LIMIT
+    assert len(IntcodeCompiler._compiled_blocks) - cached <= DISCARD_LIMIT + 2
+
+
+def test_cache_size(monkeypatch):
+    monkeypatch.setattr(IntcodeCompiler, 'CACHE_SIZE', 10)
+    for count in range(20):
+        # a loop adding count to address 13 three times, compiled from different contents each time
+        program = [1001, 12, -1, 12, 1001, 13, count, 13, 1005, 12, 0, 99, 3, 0]
+        vm = CompiledIntcodeVM(list(program), [])
+        vm.run()
+        assert vm.memory[13] == 3 * count
+        assert len(IntcodeCompiler._compiled_blocks) <= 10
+    assert sum(sum(ends.values()) for ends in IntcodeCompiler._block_ends.values()) \
+        == len(IntcodeCompiler._compiled_blocks)
+
+
+def test_day5_diagnostics():
+    with open('day5.input', 'r') as f:
+        program = [int(val) for val in f.read().split(',')]
+    for system_id in [1, 5]:
+        want = IntcodeVM(list(program), [system_id])
+        vm = CompiledIntcodeVM(list(program), [system_id])
+        assert vm.run() == want.run()
+        assert vm.memory == want.memory
+        assert vm.steps == want.steps
+
+
+def test_fork():
+    vm = CompiledIntcodeVM([3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8], [])
+    forks = [vm.fork() for _ in range(2)]
+    forks[0].add_input(8)
+    forks[1].add_input(7)
+    assert isinstance(forks[0], CompiledIntcodeVM)
+    assert [fork.run() for fork in forks] == [[1], [0]]
+
+
+def test_profiler_and_tracer(tmp_path):
+    # count address 8 down from 1000 to zero, then halt
+    program = [1001, 8, -1, 8, 1005, 8, 0, 99, 1000]
+    profiler = IntcodeProfiler()
+    vm = CompiledIntcodeVM(list(program), [], profiler=profiler)
+    vm.run()
+    assert profiler.instructions == vm.steps == 2001
+    with IntcodeTracer(str(tmp_path), checkpoint_interval=100) as tracer:
+        vm = CompiledIntcodeVM(list(program), [], tracer=tracer)
+        assert vm.tracer is tracer
+        vm.run()
+    assert IntcodeTrace(str(tmp_path)).vm_at(1000).memory[8] == 1000 - 1000 // 2
+    with pytest.raises(ValueError):
+        CompiledIntcodeVM([99], [], profiler=profiler, tracer=tracer)
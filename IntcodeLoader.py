@@ -0,0 +1,110 @@
+"""Load Intcode programs from files, parsing them a chunk at a time, and cache them in binary form.
+
+A program is parsed straight into a DenseMemory, so the file's text is never held in memory all at
+once and no list of substrings or of int objects is built. The parsed program is also saved to a
+cache file holding the raw contents of the array, which later loads read back directly, without
+parsing, for as long as the program file is unchanged (same size and modification time).
+
+Usage:
+    program = load_program('day5.input')
+    vm = IntcodeVM(program, [1])"""
+import hashlib
+import os
+import struct
+import sys
+from typing import BinaryIO, Optional
+
+from Intcode import DenseMemory
+
+# bytes of the program file parsed at a time
+CHUNK_SIZE = 1 << 16
+
+# the default directory for cached programs
+CACHE_DIR = '.intcode_cache'
+
+# a cache file starts with this header, followed by the program as little-endian 64-bit integers:
+# (magic, size of the program file, modification time of the program file in nanoseconds)
+CACHE_HEADER = struct.Struct('<8sqq')
+CACHE_MAGIC = b'INTCODE1'
+
+
+def parse_program(stream: BinaryIO, chunk_size: int = CHUNK_SIZE) -> DenseMemory:
+    """Parse comma-separated Intcode read from stream, a binary file or mmap, a chunk at a time."""
+    program = DenseMemory()
+    partial = b''  # the start of a value cut off at the end of the last chunk
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        values = (partial + chunk).split(b',')
+        partial = values.pop()
+        program.extend(map(int, values))
+    if partial.strip():
+        program.append(int(partial))
+    program.peak_nbytes = program.nbytes
+    return program
+
+
+def cache_path(filename: str, cache_dir: str = CACHE_DIR) -> str:
+    """Return the path of the cache file for the given program file."""
+    digest = hashlib.sha256(os.path.abspath(filename).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f'{os.path.basename(filename)}.{digest}.icb')
+
+
+def _read_cache(path: str, stat: os.stat_result) -> Optional[DenseMemory]:
+    try:
+        f = open(path, 'rb')
+    except OSError:  # not cached yet, or the cache directory cannot be read
+        return None
+    with f:
+        header = f.read(CACHE_HEADER.size)
+        if len(header) != CACHE_HEADER.size:
+            return None
+        magic, size, mtime = CACHE_HEADER.unpack(header)
+        if magic != CACHE_MAGIC or (size, mtime) != (stat.st_size, stat.st_mtime_ns):
+            return None  # stale, or not a cache file
+        program = DenseMemory()
+        count = (os.fstat(f.fileno()).st_size - CACHE_HEADER.size) // program.itemsize
+        program.fromfile(f, count)
+    if sys.byteorder == 'big':
+        program.byteswap()
+    program.peak_nbytes = program.nbytes
+    return program
+
+
+def _write_cache(path: str, stat: os.stat_result, program: DenseMemory):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if sys.byteorder == 'big':
+        program = DenseMemory(program)
+        program.byteswap()
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(CACHE_HEADER.pack(CACHE_MAGIC, stat.st_size, stat.st_mtime_ns))
+            program.tofile(f)
+        os.replace(temp_path, path)  # so that concurrent loads never read a partly written file
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def load_program(filename: str, cache_dir: Optional[str] = CACHE_DIR) -> DenseMemory:
+    """Return the program in the given file, reading it from the cache in cache_dir if it is there
+    and up to date, and parsing it (and updating the cache) otherwise. If cache_dir is None, the
+    program is always parsed, and not cached. The cache is only an optimisation: if it cannot be
+    written (such as in a read-only checkout), the parsed program is returned all the same."""
+    with open(filename, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if cache_dir is not None:
+            path = cache_path(filename, cache_dir)
+            program = _read_cache(path, stat)
+            if program is not None:
+                return program
+        program = parse_program(f)
+    if cache_dir is not None:
+        try:
+            _write_cache(path, stat, program)
+        except OSError:
+            pass
+    return program
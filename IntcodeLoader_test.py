@@ -0,0 +1,70 @@
+"""Tests for the program loader in IntcodeLoader.py"""
+import io
+import mmap
+import os
+
+import pytest
+
+from Intcode import DenseMemory, IntcodeVM
+from IntcodeLoader import cache_path, load_program, parse_program
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 1 << 16])
+def test_parse_program(chunk_size):
+    text = b'1002,4,3,4,33,-1,1125899906842624\n'
+    program = parse_program(io.BytesIO(text), chunk_size)
+    assert isinstance(program, DenseMemory)
+    assert list(program) == [1002, 4, 3, 4, 33, -1, 1125899906842624]
+    assert program.peak_nbytes == program.nbytes
+
+
+def test_parse_mmap(tmp_path):
+    filename = tmp_path / 'program.input'
+    filename.write_bytes(b'104,1125899906842624,99')
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        program = parse_program(mapped, chunk_size=4)
+    vm = IntcodeVM(program, [])
+    vm.run()
+    assert vm.outputs == [1125899906842624]
+
+
+def test_load_program_cache(tmp_path):
+    filename = str(tmp_path / 'program.input')
+    cache_dir = str(tmp_path / 'cache')
+    with open(filename, 'w') as f:
+        f.write('1,0,0,0,99\n')
+    assert list(load_program(filename, cache_dir)) == [1, 0, 0, 0, 99]
+    # later loads read the cache file rather than parsing the program again
+    path = cache_path(filename, cache_dir)
+    with open(path, 'ab') as f:
+        DenseMemory([7]).tofile(f)
+    assert list(load_program(filename, cache_dir)) == [1, 0, 0, 0, 99, 7]
+    # until the program changes
+    with open(filename, 'w') as f:
+        f.write('2,0,0,0,99,-5\n')
+    assert list(load_program(filename, cache_dir)) == [2, 0, 0, 0, 99, -5]
+    assert list(load_program(filename, cache_dir)) == [2, 0, 0, 0, 99, -5]
+
+
+def test_load_program_uncached(tmp_path):
+    filename = str(tmp_path / 'program.input')
+    with open(filename, 'w') as f:
+        f.write('1,0,0,0,99')
+    assert list(load_program(filename, None)) == [1, 0, 0, 0, 99]
+    assert os.listdir(tmp_path) == ['program.input']
+
+
+def test_load_program_unwritable_cache(tmp_path):
+    filename = str(tmp_path / 'program.input')
+    with open(filename, 'w') as f:
+        f.write('1,0,0,0,99')
+    # the cache directory cannot be created under a file, whoever runs the test
+    cache_dir = str(tmp_path / 'program.input' / 'cache')
+    assert list(load_program(filename, cache_dir)) == [1, 0, 0, 0, 99]
+    assert list(load_program(filename, cache_dir)) == [1, 0, 0, 0, 99]
+    assert os.listdir(tmp_path) == ['program.input']
+    # a cache file that can be neither read nor replaced
+    cache_dir = str(tmp_path / 'cache')
+    os.makedirs(cache_path(filename, cache_dir))
+    assert list(load_program(filename, cache_dir)) == [1, 0, 0, 0, 99]
+    assert os.listdir(cache_dir) == [os.path.basename(cache_path(filename, cache_dir))]
@@ -0,0 +1,90 @@
+"""Run networks of IntcodeVMs whose outputs feed each other's inputs."""
+from collections import deque
+from typing import Dict, Hashable, Iterable, List
+
+from Intcode import IntcodeVM
+
+
+class Deadlock(Exception):
+    """Raised when every VM in a network that has not halted is waiting for input that no other VM
+    can provide."""
+    def __init__(self, waiting: List[Hashable]):
+        super().__init__(f'Every running VM is waiting for input: {waiting}')
+        self.waiting = waiting
+
+
+class IntcodeNetwork:
+    """A graph of named IntcodeVMs connected by channels. Everything a VM outputs is passed to the
+    inputs of every VM it is connected to, so pipelines, feedback loops and fan-out can all be
+    built from connect() calls.
+
+    The network only runs VMs that can make progress, and runs each of them until it halts or
+    needs input, so every switch between VMs executes as many instructions as possible."""
+    def __init__(self):
+        self.vms: Dict[Hashable, IntcodeVM] = {}
+        self._channels: Dict[Hashable, List[Hashable]] = {}  # destinations of each VM
+        self._sent: Dict[Hashable, int] = {}  # number of each VM's outputs already passed on
+        self._ready = deque()  # names of the VMs that can make progress
+        self._scheduled = set()  # the same names, for fast lookup
+        self.switches = 0  # number of times the network has resumed a VM
+
+    def add_vm(self, name: Hashable, vm: IntcodeVM):
+        """Add a VM to the network under the given name."""
+        if name in self.vms:
+            raise ValueError(f'The network already has a VM named {name!r}')
+        self.vms[name] = vm
+        self._channels[name] = []
+        self._sent[name] = len(vm.outputs)
+        self._schedule(name)
+
+    def connect(self, source: Hashable, destination: Hashable):
+        """Pass every value the source VM outputs from now on to the destination VM's inputs."""
+        if destination not in self.vms:
+            raise KeyError(destination)
+        self._channels[source].append(destination)
+
+    def send(self, name: Hashable, values: Iterable[int]):
+        """Add values to the inputs of the named VM."""
+        self.vms[name].inputs.extend(values)
+        self._schedule(name)
+
+    def _schedule(self, name: Hashable):
+        if name not in self._scheduled and not self.vms[name].halted:
+            self._scheduled.add(name)
+            self._ready.append(name)
+
+    def run(self):
+        """Run the network until every VM has halted. Raise Deadlock if the VMs that have not
+        halted are all waiting for input."""
+        while self._ready:
+            name = self._ready.popleft()
+            self._scheduled.discard(name)
+            vm = self.vms[name]
+            vm.resume()
+            self.switches += 1
+            outputs = vm.outputs[self._sent[name]:]
+            if outputs:
+                self._sent[name] = len(vm.outputs)
+                for destination in self._channels[name]:
+                    self.send(destination, outputs)  # this may reschedule the VM itself
+        waiting = [name for name, vm in self.vms.items() if not vm.halted]
+        if waiting:
+            raise Deadlock(waiting)
+
+    def outputs(self, name: Hashable) -> List[int]:
+        """Return everything the named VM has output."""
+        return self.vms[name].outputs
+
+
+def pipeline(vms: List[IntcodeVM], loop: bool = False) -> IntcodeNetwork:
+    """Return a network connecting the given VMs in order, each one's outputs feeding the next
+    one's inputs. If loop is true, the last VM's outputs feed the first VM's inputs as well. The VMs
+    are named by their index in the list."""
+    network = IntcodeNetwork()
+    for name, vm in enumerate(vms):
+        network.add_vm(name, vm)
+    for source in range(len(vms) - 1):
+        network.connect(source, source + 1)
+    if loop:
+        network.connect(len(vms) - 1, 0)
+    return network
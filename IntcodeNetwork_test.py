@@ -0,0 +1,61 @@
+"""Tests for the IntcodeNetwork class in IntcodeNetwork.py"""
+import pytest
+
+from Intcode import IntcodeVM, LADDER, TABLE
+from IntcodeNetwork import Deadlock, IntcodeNetwork, pipeline
+
+# day 7 examples: amplifier programs and the phase settings that give their highest signal
+AMPLIFIER = [3, 15, 3, 16, 1002, 16, 10, 16, 1, 16, 15, 15, 4, 15, 99, 0, 0]
+FEEDBACK_AMPLIFIER = [3, 26, 1001, 26, -4, 26, 3, 27, 1002, 27, 2, 27, 1, 27, 26, 27, 4, 27, 1001,
+                      28, -1, 28, 1005, 28, 6, 99, 0, 0, 5]
+ECHO = [3, 9, 4, 9, 1105, 1, 0, 99, 99, 0]  # output every input, forever
+
+
+def amplifiers(program, phases, engine):
+    return [IntcodeVM(list(program), [phase], engine=engine) for phase in phases]
+
+
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+def test_pipeline(engine):
+    amps = amplifiers(AMPLIFIER, [4, 3, 2, 1, 0], engine)
+    amps[0].add_input(0)
+    pipeline(amps).run()
+    assert amps[-1].outputs == [43210]
+
+
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+def test_feedback_loop(engine):
+    amps = amplifiers(FEEDBACK_AMPLIFIER, [9, 8, 7, 6, 5], engine)
+    amps[0].add_input(0)
+    network = pipeline(amps, loop=True)
+    network.run()
+    assert amps[-1].outputs[-1] == 139629729
+    assert all(amp.halted for amp in amps)
+
+
+def test_fan_out():
+    network = IntcodeNetwork()
+    network.add_vm('source', IntcodeVM([104, 5, 104, 6, 99], []))
+    for name in 'ab':
+        network.add_vm(name, IntcodeVM([3, 0, 3, 1, 1, 0, 1, 0, 4, 0, 99], []))  # output sum
+        network.connect('source', name)
+    network.run()
+    assert network.outputs('a') == network.outputs('b') == [11]
+
+
+def test_deadlock():
+    network = pipeline([IntcodeVM(list(ECHO), []) for _ in range(3)], loop=True)
+    with pytest.raises(Deadlock) as excinfo:
+        network.run()
+    assert excinfo.value.waiting == [0, 1, 2]
+    assert network.switches == 3  # every VM ran once, then blocked
+
+
+def test_send_resumes_network():
+    network = pipeline([IntcodeVM(list(ECHO), []) for _ in range(200)], loop=False)
+    with pytest.raises(Deadlock):
+        network.run()
+    network.send(0, [1, 2, 3])
+    with pytest.raises(Deadlock):
+        network.run()
+    assert network.outputs(199) == [1, 2, 3]
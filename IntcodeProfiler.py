@@ -0,0 +1,89 @@
+"""Count what an IntcodeVM spends its time on, and report its hot spots.
+
+Usage:
+    profiler = IntcodeProfiler()
+    vm = IntcodeVM(program, inputs, profiler=profiler)
+    vm.run()
+    print(profiler.report())"""
+from collections import Counter
+from typing import List, Tuple
+
+from Intcode import HALT, JUMPIFFALSE, JUMPIFTRUE, OPCODE_LENGTHS
+
+OPCODE_NAMES = {1: 'ADD', 2: 'MULTIPLY', 3: 'INPUT', 4: 'OUTPUT', 5: 'JUMPIFTRUE',
+                6: 'JUMPIFFALSE', 7: 'LESSTHAN', 8: 'EQUALS', 9: 'SETRELATIVEBASE', 99: 'HALT'}
+
+
+class IntcodeProfiler:
+    """Collects execution counts from the IntcodeVMs it is given to: per opcode, per address, per
+    opcode and parameter modes, and per jump target of every jump taken. It also records every time
+    memory grew, as (step, address, peak bytes) tuples, and the wall time spent running."""
+    def __init__(self):
+        self.opcodes = Counter()
+        self.addresses = Counter()
+        self.modes = Counter()  # keyed by (opcode, modes)
+        self.jump_targets = Counter()
+        self.memory_growth: List[Tuple[int, int, int]] = []
+        self.wall_time = 0.0
+        self._opcode_at = {}  # the opcode last executed at each address
+
+    def record(self, ip: int, opcode: int, modes: Tuple[int, ...], next_ip: int):
+        """Record the execution of an instruction at ip, after which execution goes on at
+        next_ip."""
+        self.opcodes[opcode] += 1
+        self.addresses[ip] += 1
+        self.modes[opcode, modes] += 1
+        self._opcode_at[ip] = opcode
+        if next_ip != ip + OPCODE_LENGTHS[opcode] and opcode != HALT:
+            self.jump_targets[next_ip] += 1
+
+    def memory_grew(self, step: int, ip: int, peak_bytes: int):
+        """Record that the instruction at ip grew memory to peak_bytes at the given step."""
+        self.memory_growth.append((step, ip, peak_bytes))
+
+    @property
+    def instructions(self) -> int:
+        return sum(self.opcodes.values())
+
+    def basic_blocks(self) -> List[Tuple[int, int, int]]:
+        """Return the basic blocks that were executed, as (first address, last address, number of
+        instructions executed in the block) tuples, in address order. A block ends at every jump
+        and before every jump target."""
+        blocks = []
+        block = None
+        end = None  # address just past the last instruction added to the block
+        for addr in sorted(self.addresses):
+            opcode = self._opcode_at[addr]
+            if block is None or addr != end or addr in self.jump_targets:
+                if block is not None:
+                    blocks.append(tuple(block))
+                block = [addr, addr, 0]
+            block[1] = addr
+            block[2] += self.addresses[addr]
+            end = addr + OPCODE_LENGTHS[opcode]
+            if opcode in (JUMPIFTRUE, JUMPIFFALSE, HALT):
+                blocks.append(tuple(block))
+                block = None
+        if block is not None:
+            blocks.append(tuple(block))
+        return blocks
+
+    def report(self, top: int = 10) -> str:
+        """Return a human-readable report of the top addresses and basic blocks."""
+        total = self.instructions
+        rate = total / self.wall_time if self.wall_time else 0
+        lines = [f'{total:,} instructions in {self.wall_time:.3f}s ({rate:,.0f}/s)',
+                 f'Memory grew {len(self.memory_growth)} times.',
+                 '', 'Opcodes:']
+        for opcode, count in self.opcodes.most_common():
+            lines.append(f'  {OPCODE_NAMES.get(opcode, opcode):>15} {count:>12,}'
+                         f' {count / total:6.1%}')
+        lines += ['', f'Top {top} addresses:']
+        for addr, count in self.addresses.most_common(top):
+            name = OPCODE_NAMES.get(self._opcode_at[addr], self._opcode_at[addr])
+            lines.append(f'  {addr:>8} {name:>15} {count:>12,} {count / total:6.1%}')
+        lines += ['', f'Top {top} basic blocks:']
+        blocks = sorted(self.basic_blocks(), key=lambda block: block[2], reverse=True)
+        for first, last, count in blocks[:top]:
+            lines.append(f'  {first:>8}-{last:<8} {count:>12,} {count / total:6.1%}')
+        return '\n'.join(lines)
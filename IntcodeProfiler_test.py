@@ -0,0 +1,51 @@
+"""Tests for the IntcodeProfiler class in IntcodeProfiler.py"""
+import pytest
+
+from Intcode import ADD, DenseMemory, HALT, IntcodeVM, JUMPIFTRUE, LADDER, PagedMemory, TABLE
+from IntcodeProfiler import IntcodeProfiler
+
+# decrement the counter at address 8 from 5 to zero, then halt
+COUNTDOWN = [1001, 8, -1, 8, 1005, 8, 0, 99, 5]
+# day 9 example: a quine, which grows memory up to address 101
+QUINE = [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]
+
+
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+def test_counts(engine):
+    profiler = IntcodeProfiler()
+    vm = IntcodeVM(list(COUNTDOWN), [], engine=engine, profiler=profiler)
+    vm.run()
+    assert vm.memory[8] == 0
+    assert profiler.opcodes == {ADD: 5, JUMPIFTRUE: 5, HALT: 1}
+    assert profiler.addresses == {0: 5, 4: 5, 7: 1}
+    assert profiler.modes == {(ADD, (0, 1, 0)): 5, (JUMPIFTRUE, (0, 1)): 5, (HALT, ()): 1}
+    assert profiler.jump_targets == {0: 4}
+    assert profiler.instructions == vm.steps == 11
+    assert profiler.basic_blocks() == [(0, 4, 10), (7, 7, 1)]
+    assert 'Top 10 basic blocks:' in profiler.report()
+
+
+# PagedMemory only grows when a new page is written, which the quine does not do
+@pytest.mark.parametrize('memory_type', [list, DenseMemory])
+def test_memory_growth(memory_type):
+    profiler = IntcodeProfiler()
+    vm = IntcodeVM(memory_type(QUINE), [], profiler=profiler)
+    assert vm.run() == QUINE
+    assert profiler.memory_growth
+    assert profiler.memory_growth[-1][2] == vm.peak_memory
+    assert profiler.wall_time > 0
+
+
+def test_paged_memory_growth():
+    profiler = IntcodeProfiler()
+    vm = IntcodeVM(PagedMemory([1101, 1, 2, 10 ** 9, 99]), [], profiler=profiler)
+    vm.run()
+    assert profiler.memory_growth == [(1, 0, vm.peak_memory)]
+
+
+def test_forks_share_profiler():
+    profiler = IntcodeProfiler()
+    vm = IntcodeVM(list(COUNTDOWN), [], profiler=profiler)
+    vm.fork().run()
+    vm.fork().run()
+    assert profiler.instructions == 22
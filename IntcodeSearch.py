@@ -0,0 +1,81 @@
+"""Evaluate an Intcode program over a space of parameters in parallel, with a pool of processes.
+
+Each worker process loads the program into an IntcodeVM once. Parameters are sent to the workers
+in chunks, and for each one the worker calls evaluate(vm, params), which should run a fork of vm
+(see IntcodeVM.fork()) with those parameters and return the result. evaluate must be a function
+defined at the top level of a module, so that it can be sent to the workers."""
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from Intcode import IntcodeVM
+
+Evaluator = Callable[[IntcodeVM, object], int]
+
+# the program loaded into this worker process by _load_program()
+_worker_vm = None
+
+
+def _load_program(program: List[int]):
+    global _worker_vm
+    _worker_vm = IntcodeVM(list(program), [])
+
+
+def _max_of_chunk(evaluate: Evaluator, chunk: list) -> Tuple[object, int]:
+    best_params, best_value = None, None
+    for params in chunk:
+        value = evaluate(_worker_vm, params)
+        if best_value is None or value > best_value:
+            best_params, best_value = params, value
+    return best_params, best_value
+
+
+def _find_in_chunk(evaluate: Evaluator, chunk: list, target: int) -> Optional[object]:
+    for params in chunk:
+        if evaluate(_worker_vm, params) == target:
+            return params
+    return None
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """Split an iterable into lists of the given size (the last one may be shorter)."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parallel_max(program: List[int], evaluate: Evaluator, parameters: Iterable,
+                 chunksize: int = 16, max_workers: int = None) -> Tuple[object, int]:
+    """Evaluate the program for every parameter and return the parameter giving the highest result,
+    along with that result. Results are reduced as they arrive from the workers."""
+    best_params, best_value = None, None
+    with ProcessPoolExecutor(max_workers, initializer=_load_program,
+                             initargs=(program,)) as pool:
+        futures = [pool.submit(_max_of_chunk, evaluate, chunk)
+                   for chunk in chunked(parameters, chunksize)]
+        for future in as_completed(futures):
+            params, value = future.result()
+            if best_value is None or value > best_value:
+                best_params, best_value = params, value
+    return best_params, best_value
+
+
+def parallel_find(program: List[int], evaluate: Evaluator, parameters: Iterable, target: int,
+                  chunksize: int = 100, max_workers: int = None) -> Optional[object]:
+    """Evaluate the program for the given parameters until one gives the target result, and return
+    that parameter, or None if no parameter does. Chunks that have not started yet are cancelled as
+    soon as a match is found. If several parameters match, any one of them may be returned."""
+    with ProcessPoolExecutor(max_workers, initializer=_load_program,
+                             initargs=(program,)) as pool:
+        futures = [pool.submit(_find_in_chunk, evaluate, chunk, target)
+                   for chunk in chunked(parameters, chunksize)]
+        for future in as_completed(futures):
+            params = future.result()
+            if params is not None:
+                for pending in futures:
+                    pending.cancel()
+                return params
+    return None
@@ -0,0 +1,44 @@
+"""Tests for the parallel search functions in IntcodeSearch.py"""
+import itertools
+
+from IntcodeSearch import chunked, parallel_find, parallel_max
+
+# day 7 example: amplifier program, whose highest signal comes from phase settings 4, 3, 2, 1, 0
+AMPLIFIER = [3, 15, 3, 16, 1002, 16, 10, 16, 1, 16, 15, 15, 4, 15, 99, 0, 0]
+# add the numbers at addresses 5 and 6 into address 0
+ADDER = [1, 5, 6, 0, 99, 0, 0]
+
+
+def chain_signal(orig_amp, phases):
+    signal = 0
+    for phase in phases:
+        amplifier = orig_amp.fork()
+        amplifier.add_input(phase)
+        amplifier.add_input(signal)
+        signal = amplifier.run()[0]
+    return signal
+
+
+def noun_plus_verb(orig_vm, noun_verb):
+    vm = orig_vm.fork()
+    vm.write(noun_verb[0], 5)
+    vm.write(noun_verb[1], 6)
+    vm.run()
+    return vm.memory[0]
+
+
+def test_chunked():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_parallel_max():
+    permutations = itertools.permutations(range(5))
+    assert parallel_max(AMPLIFIER, chain_signal, permutations, chunksize=7,
+                        max_workers=2) == ((4, 3, 2, 1, 0), 43210)
+
+
+def test_parallel_find():
+    noun_verbs = itertools.product(range(10, 20), range(30, 50))
+    params = parallel_find(ADDER, noun_plus_verb, noun_verbs, 13 + 31, chunksize=5, max_workers=2)
+    assert sum(params) == 13 + 31
+    assert parallel_find(ADDER, noun_plus_verb, [(1, 2)], 4, max_workers=2) is None
@@ -0,0 +1,406 @@
+"""Record what an IntcodeVM does to disk, and replay the recording from any step.
+
+A trace is a directory of segment files. Every segment starts with a checkpoint of the VM's complete
+state (memory, instruction pointer, relative base, step count), followed by a record of every input
+the VM consumed and every output it produced until the next checkpoint, which starts the next
+segment. Records are streamed to disk as the VM runs, and once the trace's files add up to more
+than its size limit, its oldest segments are deleted, so neither memory nor disk use grows with the
+length of the run.
+
+Replaying restores the latest checkpoint at or before the step asked for and runs the program on
+from there, feeding it the recorded inputs, so reaching any step of a long run costs at most one
+checkpoint interval of execution.
+
+Usage:
+    with IntcodeTracer('trace') as tracer:
+        IntcodeVM(program, inputs, tracer=tracer).run()
+    vm = IntcodeTrace('trace').vm_at(123456789)  # the VM about to execute that step
+
+File format: a segment is named after the step of its checkpoint, and starts with SEGMENT_MAGIC.
+Integers are written as LEB128 varints, signed ones zigzag encoded first, and steps are written
+relative to the previous record of the segment. A checkpoint record is b'C', then steps, ip,
+relative base (signed), halted (one byte), memory backend (one byte, see BACKENDS), memory length
+and page count, then for every page that is not all zeros: page number, cell count, and either b'q'
+and the cells as little-endian 64-bit integers, or b'v' and the cells as signed varints (for lists
+holding values too big for 64 bits). Input and output records are b'I' or b'O', then steps and the
+value (signed)."""
+import bisect
+import os
+import sys
+from array import array
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
+
+from Intcode import DenseMemory, HALTED, INPUT, IntcodeVM, OUTPUT, PAGE_SIZE, PagedMemory, TABLE
+
+# instructions executed between checkpoints, by default
+CHECKPOINT_INTERVAL = 1_000_000
+
+# bytes a trace may take up on disk before its oldest segments are deleted, by default
+MAX_BYTES = 64 << 20
+
+SEGMENT_MAGIC = b'ICTRACE1'
+SEGMENT_SUFFIX = '.trace'
+
+CHECKPOINT = ord('C')
+INPUT_RECORD = ord('I')
+OUTPUT_RECORD = ord('O')
+
+# the memory backends a checkpoint can hold, by their code in the file
+BACKENDS = {0: list, 1: DenseMemory, 2: PagedMemory}
+
+
+class TraceEvent(NamedTuple):
+    kind: int  # INPUT or OUTPUT
+    steps: int  # the number of instructions executed before the one that consumed or produced it
+    value: int
+
+
+def _put_varint(out: bytearray, value: int):
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _put_signed(out: bytearray, value: int):
+    _put_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+
+
+def _get_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """Return the varint at data[pos:] and the position after it. Raise IndexError if the data
+    ends first."""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _get_signed(data: bytes, pos: int) -> Tuple[int, int]:
+    value, pos = _get_varint(data, pos)
+    return (value >> 1 if not value & 1 else -((value + 1) >> 1)), pos
+
+
+def segment_steps(directory: str) -> List[int]:
+    """Return the steps of the checkpoints starting the segments of the trace in directory, in
+    order."""
+    steps = []
+    for name in os.listdir(directory):
+        stem, suffix = os.path.splitext(name)
+        if suffix == SEGMENT_SUFFIX and stem.isdigit():
+            steps.append(int(stem))
+    return sorted(steps)
+
+
+def segment_path(directory: str, steps: int) -> str:
+    return os.path.join(directory, f'{steps:020d}{SEGMENT_SUFFIX}')
+
+
+def _memory_pages(memory) -> Iterator[Tuple[int, object]]:
+    """Yield (page number, cells) for every page of memory that may hold something other than
+    zeros."""
+    if isinstance(memory, PagedMemory):
+        yield from memory.pages()
+        return
+    for number, start in enumerate(range(0, len(memory), PAGE_SIZE)):
+        cells = memory[start:start + PAGE_SIZE]
+        if cells.count(0) != len(cells):
+            yield number, cells
+
+
+class IntcodeTracer:
+    """Records the inputs, outputs and periodic checkpoints of the IntcodeVM it is given to, as a
+    trace in directory. Any trace already there is deleted.
+
+    A checkpoint is taken when the VM first runs, and then every checkpoint_interval instructions.
+    Once the trace takes up more than max_bytes, its oldest segments are deleted; the segment being
+    written is always kept. A VM doing so much I/O that its records alone take up a quarter of
+    max_bytes is checkpointed early, so that older segments can go.
+
+    The trace is written through a buffer: flush() or close() the tracer before reading a trace
+    that is still being recorded."""
+    def __init__(self, directory: str, checkpoint_interval: int = CHECKPOINT_INTERVAL,
+                 max_bytes: int = MAX_BYTES):
+        if checkpoint_interval < 1:
+            raise ValueError('The checkpoint interval must be at least one instruction')
+        os.makedirs(directory, exist_ok=True)
+        for steps in segment_steps(directory):
+            os.remove(segment_path(directory, steps))
+        self.directory = directory
+        self.checkpoint_interval = checkpoint_interval
+        self.max_bytes = max_bytes
+        self.next_checkpoint = 0  # the VM checkpoints once it has executed this many instructions
+        self.total_bytes = 0  # bytes in every segment still on disk
+        self._segments = []  # (steps, bytes) of every finished segment still on disk, oldest first
+        self._file: Optional[BinaryIO] = None
+        self._segment_start = 0
+        self._segment_bytes = 0
+        self._record_bytes = 0  # bytes of input and output records in the current segment
+        self._last_steps = 0  # steps of the last record written
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+        self._segment_bytes += len(data)
+        self.total_bytes += len(data)
+
+    def _trim(self):
+        """Delete the oldest finished segments until the trace fits in max_bytes again, or only the
+        current segment is left."""
+        while self._segments and self.total_bytes > self.max_bytes:
+            steps, size = self._segments.pop(0)
+            os.remove(segment_path(self.directory, steps))
+            self.total_bytes -= size
+
+    def checkpoint(self, vm: IntcodeVM):
+        """Start a new segment with a checkpoint of the given VM's state."""
+        if self._file is not None:
+            self._file.close()
+            self._segments.append((self._segment_start, self._segment_bytes))
+        self._file = open(segment_path(self.directory, vm.steps), 'wb')
+        self._segment_start = vm.steps
+        self._segment_bytes = 0
+        self._record_bytes = 0
+        self._last_steps = vm.steps
+        memory = vm.memory
+        header = bytearray(SEGMENT_MAGIC)
+        header.append(CHECKPOINT)
+        _put_varint(header, vm.steps)
+        _put_varint(header, vm.ip)
+        _put_signed(header, vm.relativebase)
+        header.append(vm.halted)
+        header.append(next(code for code, backend in BACKENDS.items()
+                           if type(memory) is backend))
+        _put_varint(header, len(memory))
+        pages = list(_memory_pages(memory))
+        _put_varint(header, len(pages))
+        self._write(header)
+        for number, cells in pages:
+            record = bytearray()
+            _put_varint(record, number)
+            _put_varint(record, len(cells))
+            try:
+                cells = array('q', cells)
+            except OverflowError:
+                record.append(ord('v'))
+                for value in cells:
+                    _put_signed(record, value)
+            else:
+                if sys.byteorder == 'big':
+                    cells.byteswap()
+                record.append(ord('q'))
+                record += cells.tobytes()
+            self._write(record)
+        self.next_checkpoint = vm.steps + self.checkpoint_interval
+        self._trim()
+
+    def _record(self, kind: int, steps: int, value: int):
+        record = bytearray((kind,))
+        _put_varint(record, steps - self._last_steps)
+        _put_signed(record, value)
+        self._last_steps = steps
+        self._write(record)
+        self._record_bytes += len(record)
+        if self._record_bytes > self.max_bytes // 4:
+            self.next_checkpoint = steps + 1
+        if self.total_bytes > self.max_bytes:
+            self._trim()
+
+    def input(self, steps: int, value: int):
+        """Record that the instruction executed after the given number of steps consumed value."""
+        self._record(INPUT_RECORD, steps, value)
+
+    def output(self, steps: int, value: int):
+        """Record that the instruction executed after the given number of steps produced value."""
+        self._record(OUTPUT_RECORD, steps, value)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'IntcodeTracer':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Checkpoint(NamedTuple):
+    """The state of a VM, as recorded at the start of a segment."""
+    memory: object
+    ip: int
+    relativebase: int
+    halted: bool
+    steps: int
+
+
+class _ReplayStop(Exception):
+    pass
+
+
+class _ReplayTarget:
+    """Stands in for the tracer of a VM being replayed, to stop it at the step asked for."""
+    def __init__(self, steps: int):
+        self.next_checkpoint = steps
+
+    def checkpoint(self, vm: IntcodeVM):
+        raise _ReplayStop
+
+    def input(self, steps: int, value: int):
+        pass
+
+    def output(self, steps: int, value: int):
+        pass
+
+
+class IntcodeTrace:
+    """A trace recorded by an IntcodeTracer in directory, for reading and replaying."""
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    @property
+    def checkpoints(self) -> List[int]:
+        """The steps of every checkpoint in the trace, in order."""
+        return segment_steps(self.directory)
+
+    def _read_segment(self, steps: int) -> Tuple[bytes, int]:
+        """Return the contents of the segment starting at the given step, and the position of its
+        checkpoint record."""
+        with open(segment_path(self.directory, steps), 'rb') as f:
+            data = f.read()
+        if data[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC or data[len(SEGMENT_MAGIC)] != CHECKPOINT:
+            raise ValueError(f'Segment {steps} of trace {self.directory} is not a trace segment')
+        return data, len(SEGMENT_MAGIC) + 1
+
+    def checkpoint(self, steps: int) -> Checkpoint:
+        """Return the checkpoint taken after the given number of steps."""
+        data, pos = self._read_segment(steps)
+        return self._parse_checkpoint(data, pos)[0]
+
+    @staticmethod
+    def _parse_checkpoint(data: bytes, pos: int) -> Tuple[Checkpoint, int]:
+        steps, pos = _get_varint(data, pos)
+        ip, pos = _get_varint(data, pos)
+        relativebase, pos = _get_signed(data, pos)
+        halted, backend = bool(data[pos]), BACKENDS[data[pos + 1]]
+        length, pos = _get_varint(data, pos + 2)
+        count, pos = _get_varint(data, pos)
+        if backend is PagedMemory:
+            memory = PagedMemory()
+            if length:
+                memory.ensure(length - 1)
+        elif backend is DenseMemory:
+            memory = DenseMemory()
+            memory.frombytes(bytes(length * memory.itemsize))
+            memory.peak_nbytes = memory.nbytes
+        else:
+            memory = [0] * length
+        for _ in range(count):
+            number, pos = _get_varint(data, pos)
+            cells, pos = _get_varint(data, pos)
+            encoding, pos = data[pos], pos + 1
+            if encoding == ord('q'):
+                values = array('q', data[pos:pos + cells * 8])
+                if len(values) != cells:
+                    raise IndexError('Truncated checkpoint')
+                if sys.byteorder == 'big':
+                    values.byteswap()
+                pos += cells * 8
+            else:
+                values = []
+                for _ in range(cells):
+                    value, pos = _get_signed(data, pos)
+                    values.append(value)
+            start = number * PAGE_SIZE
+            if backend is PagedMemory:
+                for offset, value in enumerate(values):
+                    if value:
+                        memory[start + offset] = value
+            elif backend is list:
+                memory[start:start + cells] = list(values)
+            else:
+                memory[start:start + cells] = array('q', values)
+        return Checkpoint(memory, ip, relativebase, halted, steps), pos
+
+    @staticmethod
+    def _skip_checkpoint(data: bytes, pos: int) -> int:
+        """Return the position after the checkpoint record at data[pos:], without restoring its
+        memory."""
+        for _ in range(3):  # steps, ip and relative base
+            _, pos = _get_varint(data, pos)
+        _, pos = _get_varint(data, pos + 2)  # after halted and backend: length
+        count, pos = _get_varint(data, pos)
+        for _ in range(count):
+            _, pos = _get_varint(data, pos)
+            cells, pos = _get_varint(data, pos)
+            encoding, pos = data[pos], pos + 1
+            if encoding == ord('q'):
+                pos += cells * 8
+            else:
+                for _ in range(cells):
+                    _, pos = _get_varint(data, pos)
+        return pos
+
+    def _segment_events(self, steps: int, data: bytes, pos: int) -> Iterator[TraceEvent]:
+        while pos < len(data):
+            try:
+                kind = data[pos]
+                delta, pos = _get_varint(data, pos + 1)
+                value, pos = _get_signed(data, pos)
+            except IndexError:
+                return  # the trace was cut off part way through a record
+            steps += delta
+            yield TraceEvent(INPUT if kind == INPUT_RECORD else OUTPUT, steps, value)
+
+    def events(self, start: int = 0) -> Iterator[TraceEvent]:
+        """Yield every input and output recorded from the segment containing the given step on (all
+        of those still in the trace by default), in order."""
+        checkpoints = self.checkpoints
+        first = max(bisect.bisect_right(checkpoints, start) - 1, 0)
+        for steps in checkpoints[first:]:
+            data, pos = self._read_segment(steps)
+            pos = self._skip_checkpoint(data, pos)
+            yield from self._segment_events(steps, data, pos)
+
+    def vm_at(self, steps: int, **options) -> IntcodeVM:
+        """Return a VM in the state the traced VM was in after executing the given number of
+        instructions. Its input queue holds every input the traced VM consumed from then on, so
+        running it repeats the rest of the recorded run. Its output list only holds the outputs
+        produced since the checkpoint it was replayed from. Options are passed on to
+        IntcodeVM().
+
+        Raise ValueError if the step is not covered by the trace, or the replay does not produce
+        the recorded outputs (as when its files have been damaged)."""
+        checkpoints = self.checkpoints
+        index = bisect.bisect_right(checkpoints, steps) - 1
+        if index < 0:
+            raise ValueError(f'Trace {self.directory} has no checkpoint at or before step {steps}')
+        checkpoint = self.checkpoint(checkpoints[index])
+        inputs, expected = [], []
+        for event in self.events(checkpoint.steps):
+            if event.kind == INPUT:
+                inputs.append(event.value)
+            elif event.steps < steps:
+                expected.append(event.value)
+        vm = IntcodeVM(checkpoint.memory, inputs, engine=TABLE, tracer=_ReplayTarget(steps))
+        vm.ip = checkpoint.ip
+        vm.relativebase = checkpoint.relativebase
+        vm.halted = checkpoint.halted
+        vm.steps = checkpoint.steps
+        try:
+            result = vm.resume()
+        except _ReplayStop:
+            pass
+        else:
+            if result is not HALTED or vm.steps != steps:
+                raise ValueError(f'Trace {self.directory} ends before step {steps}')
+        if vm.outputs != expected:
+            raise ValueError(f'Replaying trace {self.directory} did not reproduce its outputs')
+        return IntcodeVM.from_snapshot(vm.snapshot(), **options)
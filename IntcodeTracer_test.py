@@ -0,0 +1,163 @@
+"""Tests for the IntcodeTracer and IntcodeTrace classes in IntcodeTracer.py"""
+import os
+
+import pytest
+
+from Intcode import DenseMemory, INPUT, IntcodeVM, NEEDS_INPUT, OUTPUT, PagedMemory
+from IntcodeProfiler import IntcodeProfiler
+from IntcodeTracer import IntcodeTrace, IntcodeTracer, TraceEvent
+from Intcode_test import TESTS
+
+# day 9 example: a quine, which outputs its 16 cells and grows memory up to address 101
+QUINE = [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]
+# day 5 example: output 999, 1000 or 1001 as the input is below, equal to or above 8
+COMPARE = TESTS[24][0]
+# output the counter at address 10 as it counts down from 1000 to 1, then halt
+COUNTDOWN = [4, 10, 1001, 10, -1, 10, 1005, 10, 0, 99, 1000]
+
+
+class SnapshotTracer:
+    """A tracer that snapshots the VM before every instruction, to check replays against."""
+    def __init__(self):
+        self.next_checkpoint = 0
+        self.snapshots = {}
+
+    def checkpoint(self, vm):
+        self.snapshots[vm.steps] = vm.snapshot()
+        self.next_checkpoint = vm.steps + 1
+
+    def input(self, steps, value):
+        pass
+
+    def output(self, steps, value):
+        pass
+
+
+def cells(memory):
+    return memory.tolist() if isinstance(memory, PagedMemory) else list(memory)
+
+
+@pytest.mark.parametrize('memory_type', [list, DenseMemory, PagedMemory])
+@pytest.mark.parametrize('program,want_memory,inputs,want_outputs', TESTS)
+def test_replay(program, want_memory, inputs, want_outputs, memory_type, tmp_path):
+    with IntcodeTracer(str(tmp_path), checkpoint_interval=3) as tracer:
+        vm = IntcodeVM(memory_type(program), inputs, tracer=tracer)
+        assert vm.run() == want_outputs
+    assert cells(vm.memory)[:len(want_memory)] == want_memory
+
+    direct = SnapshotTracer()
+    IntcodeVM(memory_type(program), inputs, tracer=direct).run()
+    trace = IntcodeTrace(str(tmp_path))
+    assert trace.checkpoints == list(range(0, vm.steps, 3))
+    for steps, snapshot in direct.snapshots.items():
+        replayed = trace.vm_at(steps)
+        assert type(replayed.memory) is memory_type
+        assert replayed.steps == steps
+        assert (replayed.ip, replayed.relativebase) == (snapshot.ip, snapshot.relativebase)
+        assert cells(replayed.memory) == cells(snapshot.memory)
+        # the replayed VM runs on to the end of the recorded run
+        produced = len(replayed.outputs)
+        assert replayed.run()[produced:] == want_outputs[len(snapshot.outputs):]
+
+
+def test_events(tmp_path):
+    with IntcodeTracer(str(tmp_path)) as tracer:
+        vm = IntcodeVM(list(COMPARE), [9], tracer=tracer)
+        assert vm.run() == [1001]
+    # the output is followed by a jump to the HALT instruction
+    assert list(IntcodeTrace(str(tmp_path)).events()) == [TraceEvent(INPUT, 0, 9),
+                                                          TraceEvent(OUTPUT, vm.steps - 3, 1001)]
+
+
+def test_inputs_given_while_running(tmp_path):
+    # add the inputs one at a time, as they are asked for, and echo each of them until a zero
+    program = [3, 9, 4, 9, 1005, 9, 0, 99, 0, 0]
+    with IntcodeTracer(str(tmp_path), checkpoint_interval=2) as tracer:
+        vm = IntcodeVM(list(program), [], tracer=tracer)
+        for value in (5, -7, 10 ** 12, 0):
+            assert vm.resume() == NEEDS_INPUT
+            vm.add_input(value)
+        vm.resume()
+        assert vm.outputs == [5, -7, 10 ** 12, 0]
+    # replaying from the checkpoint at step 4, just before -7 is output
+    replayed = IntcodeTrace(str(tmp_path)).vm_at(5)
+    assert list(replayed.inputs) == [10 ** 12, 0]
+    assert replayed.run() == [-7, 10 ** 12, 0]
+
+
+def test_values_beyond_64_bits(tmp_path):
+    # square 2 ** 40 into address 9, then output it
+    program = [2, 10, 10, 9, 4, 9, 99, 0, 0, 0, 2 ** 40]
+    with IntcodeTracer(str(tmp_path), checkpoint_interval=1) as tracer:
+        IntcodeVM(list(program), [], tracer=tracer).run()
+    trace = IntcodeTrace(str(tmp_path))
+    assert trace.vm_at(2).memory[9] == 2 ** 80
+    assert [event.value for event in trace.events()] == [2 ** 80]
+
+
+def test_paged_memory_huge_address(tmp_path):
+    # write to address 10 ** 9, then output it
+    program = [1101, 20, 22, 10 ** 9, 4, 10 ** 9, 99]
+    with IntcodeTracer(str(tmp_path), checkpoint_interval=1) as tracer:
+        IntcodeVM(PagedMemory(program), [], tracer=tracer).run()
+    assert max(os.path.getsize(os.path.join(tmp_path, name))
+               for name in os.listdir(tmp_path)) < 20000
+    replayed = IntcodeTrace(str(tmp_path)).vm_at(1)
+    assert replayed.memory[10 ** 9] == 42
+    assert replayed.run() == [42]
+
+
+def test_size_limit(tmp_path):
+    max_bytes = 2000
+    with IntcodeTracer(str(tmp_path), checkpoint_interval=50, max_bytes=max_bytes) as tracer:
+        vm = IntcodeVM(list(COUNTDOWN), [], tracer=tracer)
+        assert vm.run() == list(range(1000, 0, -1))
+    trace = IntcodeTrace(str(tmp_path))
+    checkpoints = trace.checkpoints
+    assert checkpoints == list(range(checkpoints[0], vm.steps, 50))
+    total = sum(os.path.getsize(os.path.join(tmp_path, name)) for name in os.listdir(tmp_path))
+    assert total == tracer.total_bytes <= max_bytes
+    with pytest.raises(ValueError):
+        trace.vm_at(0)  # its segment was deleted
+    replayed = trace.vm_at(2500)
+    assert replayed.memory[10] == 1000 - 2500 // 3
+    assert replayed.run()[-1] == 1
+
+
+def test_io_heavy_segments_are_cut_short(tmp_path):
+    with IntcodeTracer(str(tmp_path), max_bytes=1000) as tracer:
+        assert len(IntcodeVM(list(COUNTDOWN), [], tracer=tracer).run()) == 1000
+    assert len(IntcodeTrace(str(tmp_path)).checkpoints) > 1
+    assert tracer.total_bytes <= 1000
+
+
+def test_truncated_trace(tmp_path):
+    with IntcodeTracer(str(tmp_path)) as tracer:
+        IntcodeVM(list(QUINE), [], tracer=tracer).run()
+    trace = IntcodeTrace(str(tmp_path))
+    path = os.path.join(tmp_path, os.listdir(tmp_path)[0])
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 1)  # cut the last output record short
+    assert [event.value for event in trace.events()] == QUINE[:-1]
+
+
+def test_replay_past_the_end(tmp_path):
+    with IntcodeTracer(str(tmp_path)) as tracer:
+        IntcodeVM(list(COMPARE), [9], tracer=tracer).run()
+    trace = IntcodeTrace(str(tmp_path))
+    with pytest.raises(ValueError):
+        trace.vm_at(10 ** 6)
+
+
+def test_profiler_and_tracer(tmp_path):
+    with pytest.raises(ValueError):
+        IntcodeVM([99], [], profiler=IntcodeProfiler(), tracer=IntcodeTracer(str(tmp_path)))
+
+
+def test_forks_are_not_traced(tmp_path):
+    with IntcodeTracer(str(tmp_path)) as tracer:
+        vm = IntcodeVM(list(COMPARE), [9], tracer=tracer)
+        forked = vm.fork()
+        assert forked.tracer is None
+        assert forked.run() == [1001]
+    assert tracer.total_bytes == 0
@@ -0,0 +1,314 @@
+"""Benchmark the IntcodeVM on representative workloads, and track the results over time.
+
+Every workload is run with every VM configuration, and reported as instructions per second, wall
+time and peak memory. The cost of each opcode is measured separately, with loops that repeat a
+single instruction. Results are appended to a JSON history file, and compared against the previous
+run in it: a configuration that got slower by more than the threshold is reported as a regression,
+and makes the script exit with status 1. The history file defaults to bench_history.json in the
+current directory, which git ignores.
+
+Usage: python Intcode_bench.py [--history FILE] [--threshold FRACTION] [--no-save]"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple
+
+from Intcode import (ADD, EQUALS, INPUT, IntcodeVM, JUMPIFFALSE, JUMPIFTRUE, LESSTHAN, MULTIPLY,
+                     OUTPUT, SETRELATIVEBASE, TABLE, fork_memory)
+from IntcodeCompiler import CompiledIntcodeVM
+from IntcodeLoader import load_program
+from IntcodeProfiler import OPCODE_NAMES
+
+HISTORY_FILE = 'bench_history.json'
+# a configuration is a regression if its instructions per second dropped by more than this fraction
+DEFAULT_THRESHOLD = 0.10
+
+# VM configurations to benchmark: name -> (VM class, options passed to it)
+CONFIGURATIONS = {
+    'ladder': (IntcodeVM, {}),
+    'uncached': (IntcodeVM, {'decode_cache': False}),
+    'table': (IntcodeVM, {'engine': TABLE}),
+    'compiled': (CompiledIntcodeVM, {}),
+}
+
+
+def countdown_program(iterations: int) -> List[int]:
+    """Return a program that decrements a counter from the given value to zero, then halts."""
+    return [1001, 8, -1, 8,  # add -1 to the counter at address 8
+            1005, 8, 0,  # jump back to address 0 while the counter is nonzero
+            99,
+            iterations]  # address 8: the counter
+
+
+def fill_program(iterations: int) -> List[int]:
+    """Return a program that writes a counter, decrementing from the given value to zero, to
+    successive addresses starting at 1000 through the relative base, then halts. Memory grows by one
+    address every iteration."""
+    return [109, 1000,  # set the relative base to 1000
+            21001, 16, 0, 0,  # address 2: copy the counter to the relative base
+            109, 1,  # move the relative base on
+            1001, 16, -1, 16,  # add -1 to the counter
+            1005, 16, 2,  # jump back to address 2 while the counter is nonzero
+            99,
+            iterations]  # address 16: the counter
+
+
+def opcode_program(instruction: List[int], repeats: int, iterations: int) -> List[int]:
+    """Return a program that runs the given instruction repeats times per trip around a loop, for
+    the given number of iterations, then halts. Address 3 is scratch space for the instruction to
+    write to. With repeats=0, this measures the cost of the loop itself."""
+    body = instruction * repeats
+    counter = 12 + len(body)  # the address of the loop counter
+    return ([1105, 1, 4,  # skip over the scratch space
+             0]  # address 3: scratch space
+            + body
+            + [1001, counter, -1, counter,  # add -1 to the counter
+               1005, counter, 4,  # jump back to the start of the body while the counter is nonzero
+               99,
+               iterations])
+
+
+# an instruction for each opcode that can be repeated without changing the course of the program
+OPCODE_INSTRUCTIONS = {
+    ADD: [1101, 1, 2, 3],
+    MULTIPLY: [1102, 3, 4, 3],
+    INPUT: [3, 3],
+    OUTPUT: [104, 5],
+    JUMPIFTRUE: [1105, 0, 0],  # never jumps
+    JUMPIFFALSE: [1106, 1, 0],  # never jumps
+    LESSTHAN: [1107, 1, 2, 3],
+    EQUALS: [1108, 1, 2, 3],
+    SETRELATIVEBASE: [109, 0],
+}
+
+
+# Workloads take a VM class and the options to create VMs with, run to completion, and return every
+# VM they ran, so that their instructions and memory can be added up.
+Workload = Callable[[type, dict], List[IntcodeVM]]
+
+
+def day2_grid(vm_class: type, options: dict) -> List[IntcodeVM]:
+    """Run day 2's program for every noun and verb, as part 2 does."""
+    orig_vm = vm_class(load_program('day2.input'), [], **options)
+    vms = []
+    for noun, verb in itertools.product(range(100), repeat=2):
+        vm = orig_vm.fork()
+        vm.write(noun, 1)
+        vm.write(verb, 2)
+        vm.run()
+        vms.append(vm)
+    return vms
+
+
+def day5_diagnostics(vm_class: type, options: dict) -> List[IntcodeVM]:
+    """Run day 5's diagnostics with both system IDs."""
+    program = load_program('day5.input')
+    vms = [vm_class(fork_memory(program), [system], **options) for system in (1, 5)]
+    for vm in vms:
+        vm.run()
+    return vms
+
+
+def day7_chains(vm_class: type, options: dict) -> List[IntcodeVM]:
+    """Run day 7's amplifiers in series for every permutation of phase settings."""
+    orig_amp = vm_class(load_program('day7.input'), [], **options)
+    vms = []
+    for phases in itertools.permutations(range(5)):
+        signal = 0
+        for phase in phases:
+            amp = orig_amp.fork()
+            amp.add_input(phase)
+            amp.add_input(signal)
+            signal = amp.run()[0]
+            vms.append(amp)
+    return vms
+
+
+def day7_feedback(vm_class: type, options: dict) -> List[IntcodeVM]:
+    """Run day 7's amplifiers in a feedback loop for every permutation of phase settings."""
+    from IntcodeNetwork import pipeline
+    orig_amp = vm_class(load_program('day7.input'), [], **options)
+    vms = []
+    for phases in itertools.permutations(range(5, 10)):
+        amps = [orig_amp.fork() for _ in phases]
+        for amp, phase in zip(amps, phases):
+            amp.add_input(phase)
+        amps[0].add_input(0)
+        pipeline(amps, loop=True).run()
+        vms.extend(amps)
+    return vms
+
+
+def synthetic_countdown(vm_class: type, options: dict) -> List[IntcodeVM]:
+    """Run a tight loop of 200,000 iterations."""
+    vm = vm_class(countdown_program(200_000), [], **options)
+    vm.run()
+    return [vm]
+
+
+def synthetic_fill(vm_class: type, options: dict) -> List[IntcodeVM]:
+    """Run a loop of 50,000 iterations that writes through the relative base and grows memory."""
+    vm = vm_class(fill_program(50_000), [], **options)
+    vm.run()
+    return [vm]
+
+
+WORKLOADS: Dict[str, Workload] = {
+    'day2-grid': day2_grid,
+    'day5-diagnostics': day5_diagnostics,
+    'day7-chains': day7_chains,
+    'day7-feedback': day7_feedback,
+    'countdown': synthetic_countdown,
+    'fill': synthetic_fill,
+}
+
+
+class BenchResult(NamedTuple):
+    instructions: int
+    wall_time: float
+    peak_memory: int  # the highest peak memory of any VM in the workload, in bytes
+
+    @property
+    def rate(self) -> float:
+        """Instructions per second."""
+        return self.instructions / self.wall_time
+
+
+def bench_workload(workload: Workload, vm_class: type, options: dict,
+                   repeat: int = 3) -> BenchResult:
+    """Run the workload repeat times, and return the result of the fastest run."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        vms = workload(vm_class, options)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best.wall_time:
+            best = BenchResult(sum(vm.steps for vm in vms), elapsed,
+                               max(vm.peak_memory for vm in vms))
+    return best
+
+
+def opcode_costs(vm_class: type, options: dict, repeats: int = 20,
+                 iterations: int = 2000) -> Dict[str, float]:
+    """Return the cost of each opcode in nanoseconds, keyed by opcode name. The cost of the loop
+    around the repeated instructions is subtracted."""
+    def run_time(program, inputs=()):
+        best = None
+        for _ in range(3):
+            vm = vm_class(list(program), list(inputs), **options)
+            start = time.perf_counter()
+            vm.run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    loop_time = run_time(opcode_program([], 0, iterations))
+    costs = {}
+    for opcode, instruction in OPCODE_INSTRUCTIONS.items():
+        inputs = [0] * (repeats * iterations) if opcode == INPUT else ()
+        elapsed = run_time(opcode_program(instruction, repeats, iterations), inputs)
+        costs[OPCODE_NAMES[opcode]] = (elapsed - loop_time) / (repeats * iterations) * 1e9
+    return costs
+
+
+def run_suite(workloads: Dict[str, Workload] = None, configurations: dict = None,
+              repeat: int = 3) -> dict:
+    """Run every workload with every configuration, and measure every configuration's opcode
+    costs. Return the results as a JSON-serialisable dict."""
+    if workloads is None:
+        workloads = WORKLOADS
+    if configurations is None:
+        configurations = CONFIGURATIONS
+    results = {}
+    costs = {}
+    for config, (vm_class, options) in configurations.items():
+        for name, workload in workloads.items():
+            result = bench_workload(workload, vm_class, options, repeat)
+            results[f'{name}/{config}'] = {**result._asdict(), 'rate': result.rate}
+        costs[config] = opcode_costs(vm_class, options)
+    return {'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'results': results,
+            'opcode_costs': costs}
+
+
+def load_history(filename: str) -> List[dict]:
+    """Return the runs recorded in the history file, oldest first."""
+    if not os.path.exists(filename):
+        return []
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def save_history(filename: str, history: List[dict]):
+    with open(filename, 'w') as f:
+        json.dump(history, f, indent=1)
+
+
+def find_regressions(baseline: dict, run: dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Return a description of every result of run whose instructions per second dropped by more
+    than threshold (a fraction) from baseline."""
+    regressions = []
+    for key, result in run['results'].items():
+        try:
+            old_rate = baseline['results'][key]['rate']
+        except KeyError:  # not benchmarked in the baseline
+            continue
+        change = result['rate'] / old_rate - 1
+        if change < -threshold:
+            regressions.append(f'{key}: {old_rate:,.0f} -> {result["rate"]:,.0f} instructions/sec'
+                               f' ({change:+.1%})')
+    return regressions
+
+
+def report(run: dict, baseline: dict = None) -> str:
+    """Return a human-readable report of a run, compared against baseline if there is one."""
+    lines = [f'{"workload/configuration":<28} {"instr/sec":>12} {"wall time":>10}'
+             f' {"peak memory":>12} {"change":>8}']
+    for key, result in run['results'].items():
+        line = (f'{key:<28} {result["rate"]:>12,.0f} {result["wall_time"]:>9.3f}s'
+                f' {result["peak_memory"]:>12,}')
+        if baseline is not None and key in baseline['results']:
+            line += f' {result["rate"] / baseline["results"][key]["rate"] - 1:>+8.1%}'
+        lines.append(line)
+    configs = list(run['opcode_costs'])
+    lines += ['', 'Opcode costs (ns):', f'  {"":>15}' + ''.join(f' {c:>10}' for c in configs)]
+    for name in run['opcode_costs'][configs[0]]:
+        lines.append(f'  {name:>15}'
+                     + ''.join(f' {run["opcode_costs"][c][name]:>10.0f}' for c in configs))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the IntcodeVM.')
+    parser.add_argument('--history', default=HISTORY_FILE,
+                        help=f'JSON file of earlier results (default: {HISTORY_FILE})')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='slowdown, as a fraction, reported as a regression (default: '
+                             f'{DEFAULT_THRESHOLD})')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs of each workload, of which the fastest counts (default: 3)')
+    parser.add_argument('--no-save', action='store_true',
+                        help='do not add this run to the history')
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    baseline = history[-1] if history else None
+    run = run_suite(repeat=args.repeat)
+    print(report(run, baseline))
+    if not args.no_save:
+        save_history(args.history, history + [run])
+    if baseline is not None:
+        regressions = find_regressions(baseline, run, args.threshold)
+        if regressions:
+            print(f'\nRegressions against the run of {baseline["time"]}:')
+            print('\n'.join(f'  {regression}' for regression in regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
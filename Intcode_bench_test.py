@@ -0,0 +1,50 @@
+"""Tests for the benchmark suite in Intcode_bench.py"""
+import pytest
+
+from Intcode import IntcodeVM
+from Intcode_bench import (CONFIGURATIONS, OPCODE_INSTRUCTIONS, fill_program, find_regressions,
+                           load_history, opcode_program, report, run_suite, save_history,
+                           synthetic_countdown)
+from IntcodeProfiler import IntcodeProfiler
+
+
+def test_fill_program():
+    vm = IntcodeVM(fill_program(5), [])
+    vm.run()
+    assert vm.memory[1000:] == [5, 4, 3, 2, 1]
+
+
+@pytest.mark.parametrize('opcode,instruction', OPCODE_INSTRUCTIONS.items())
+def test_opcode_program(opcode, instruction):
+    profiler = IntcodeProfiler()
+    vm = IntcodeVM(opcode_program(instruction, 3, 4), [0] * 12, profiler=profiler)
+    vm.run()
+    loop_profiler = IntcodeProfiler()
+    IntcodeVM(opcode_program([], 0, 4), [], profiler=loop_profiler).run()
+    assert profiler.opcodes[opcode] - loop_profiler.opcodes[opcode] == 12
+    assert profiler.instructions - loop_profiler.instructions == 12
+
+
+def test_run_suite():
+    run = run_suite({'countdown': synthetic_countdown}, repeat=1)
+    assert set(run['results']) == {f'countdown/{config}' for config in CONFIGURATIONS}
+    for result in run['results'].values():
+        assert result['instructions'] == 400_001
+        assert result['rate'] > 0
+    assert 'countdown/ladder' in report(run, run)
+
+
+def test_find_regressions():
+    baseline = {'results': {'a/ladder': {'rate': 1000}, 'b/ladder': {'rate': 1000}}}
+    run = {'results': {'a/ladder': {'rate': 950}, 'b/ladder': {'rate': 800},
+                       'c/ladder': {'rate': 10}}}
+    regressions = find_regressions(baseline, run, threshold=0.1)
+    assert len(regressions) == 1
+    assert regressions[0].startswith('b/ladder')
+
+
+def test_history(tmp_path):
+    filename = str(tmp_path / 'history.json')
+    assert load_history(filename) == []
+    save_history(filename, [{'results': {}}])
+    assert load_history(filename) == [{'results': {}}]
@@ -1,7 +1,8 @@
 """Tests for the IntcodeVM class in Intcode.py"""
 import pytest
 
-from Intcode import IntcodeVM
+from Intcode import (DenseMemory, HALTED, InputExhausted, IntcodeVM, LADDER, NEEDS_INPUT,
+                     PAGE_SIZE, PagedMemory, TABLE)
 
 # These example programs consist of four lists each:
 # The memory (program) before Intcode execution, the memory as it should look after execution,
@@ -70,13 +71,174 @@ TESTS = [
      [3, 21, 1008, 21, 8, 20, 1005, 20, 22, 107, 8, 21, 20, 1006, 20, 31,
       1106, 0, 36, 98, 1001, 9, 1002, 21, 125, 20, 4, 20, 1105, 1, 46, 104,
       999, 1105, 1, 46, 1101, 1000, 1, 20, 4, 20, 1105, 1, 46, 98, 99], [9], [1001]],
+
+    # self-modifying program: jumps over address 0, overwrites it with HALT and jumps back. Stale
+    # decoded instructions would loop forever here.
+    [[1105, 1, 4, 0, 1101, 0, 99, 0, 104, 7, 1105, 1, 0],
+     [99, 1, 4, 0, 1101, 0, 99, 0, 104, 7, 1105, 1, 0], [], [7]],
+
+    # day 9 examples, exercising opcode 9 (nicknamed SETRELATIVEBASE), the relative parameter mode,
+    # memory beyond the end of the program and large numbers
+    # a quine, which also grows memory up to address 101:
+    [[109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99],
+     [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]
+     + [0] * 84 + [16, 1], [],
+     [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]],
+    [[1102, 34915192, 34915192, 7, 4, 7, 99, 0],
+     [1102, 34915192, 34915192, 7, 4, 7, 99, 1219070632396864], [], [1219070632396864]],
+    [[104, 1125899906842624, 99], [104, 1125899906842624, 99], [], [1125899906842624]],
+    # relative mode writes: store input at relative base + 3, then output it
+    [[109, 7, 203, 3, 204, 3, 99], [109, 7, 203, 3, 204, 3, 99, 0, 0, 0, 42], [42], [42]],
+]
+
+# programs that reach a negative address, which every memory backend and engine rejects with
+# IndexError (instead of wrapping around to the end of list and array memory), with their inputs
+NEGATIVE_ADDRESS_TESTS = [
+    [[1, -5, 3, 54], []],  # read from a position
+    [[1101, 1, 2, -1, 99], []],  # write to a position
+    [[109, -3, 204, 1, 99], []],  # output from a relative address
+    [[109, -3, 21101, 1, 2, 2, 99], []],  # write to a relative address
+    [[3, -1, 99], [5]],  # input to a position
+    [[1105, 1, -4, 99], []],  # jump to an immediate address
+    [[6, 5, 6, 99, 0, 0, -3], []],  # jump to an address read from a position
 ]
 
 
+@pytest.mark.parametrize('memory_type', [list, DenseMemory, PagedMemory])
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
 @pytest.mark.parametrize('program,want_memory,inputs,want_outputs', TESTS)
-def test_intcode_vm(program, want_memory, inputs, want_outputs):
+def test_intcode_vm(program, want_memory, inputs, want_outputs, engine, memory_type):
     outputs = []
-    vm = IntcodeVM(list(program), inputs, outputs)
+    vm = IntcodeVM(memory_type(program), list(inputs), outputs, engine=engine)
     vm.run()
-    assert vm.memory == want_memory
+    if memory_type is list:
+        assert vm.memory == want_memory
+    else:
+        # backends may allocate whole pages, so compare the touched part and check the rest is zero
+        memory = vm.memory.tolist()
+        assert memory[:len(want_memory)] == want_memory
+        assert not any(memory[len(want_memory):])
     assert outputs == want_outputs
+
+
+@pytest.mark.parametrize('memory_type', [list, DenseMemory, PagedMemory])
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+@pytest.mark.parametrize('program,inputs', NEGATIVE_ADDRESS_TESTS)
+def test_negative_address(program, inputs, engine, memory_type):
+    vm = IntcodeVM(memory_type(program), list(inputs), engine=engine)
+    with pytest.raises(IndexError):
+        vm.run()
+    assert list(vm.memory)[:len(program)] == program
+    with pytest.raises(IndexError):
+        vm.write(1, -1)
+
+
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+def test_negative_input_address_needs_input(engine):
+    vm = IntcodeVM([3, -1, 99], [], engine=engine)
+    assert vm.resume() == NEEDS_INPUT
+    vm.add_input(5)
+    with pytest.raises(IndexError):
+        vm.resume()
+
+
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+def test_list_memory_grows_by_gap(engine):
+    # write to relative base 500 + 500
+    vm = IntcodeVM([109, 500, 21101, 1, 2, 500, 99], [], engine=engine)
+    vm.run()
+    assert len(vm.memory) == 1001
+    assert vm.memory[1000] == 3
+
+
+@pytest.mark.parametrize('memory_type', [list, DenseMemory, PagedMemory])
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+def test_immediate_write_grows_memory(engine, memory_type):
+    # writes treat IMMEDIATE as POSITION, so this writes 3 to address 100
+    vm = IntcodeVM(memory_type([11101, 1, 2, 100, 99]), [], engine=engine)
+    vm.run()
+    assert vm.memory[100] == 3
+
+
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+def test_paged_memory_huge_address(engine):
+    far = 10 ** 12
+    vm = IntcodeVM(PagedMemory([1101, 1, 2, far, 4, far, 4, far + 1, 99]), [], engine=engine)
+    assert vm.run() == [3, 0]
+    assert vm.memory[far] == 3
+    assert vm.peak_memory == 2 * PAGE_SIZE * 8  # the program's page and the page at far
+
+
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+@pytest.mark.parametrize('memory_type', [list, DenseMemory, PagedMemory])
+def test_fork(engine, memory_type):
+    # output 1 if input equals 8, otherwise 0 (position mode)
+    program = [3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8]
+    vm = IntcodeVM(memory_type(program), [], engine=engine)
+    forks = [vm.fork() for _ in range(3)]
+    for value, fork in zip([7, 8, 9], forks):
+        fork.add_input(value)
+    assert [fork.run() for fork in forks] == [[0], [1], [0]]
+    assert list(vm.memory)[:len(program)] == program  # the original is untouched by its forks
+    assert vm.ip == 0
+
+
+def test_paged_memory_fork_shares_pages():
+    memory = PagedMemory(range(3 * PAGE_SIZE))
+    forked = memory.fork()
+    forked[0] = -1
+    assert memory[0] == 0
+    assert forked[0] == -1
+    assert forked._pages[0] is not memory._pages[0]  # the written page was copied
+    assert forked._pages[1] is memory._pages[1]  # the others are still shared
+    memory[1] = -2
+    assert forked[1] == 1
+
+
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+def test_snapshot(engine):
+    vm = IntcodeVM(PagedMemory([3, 0, 4, 0, 3, 0, 4, 0, 99]), [5], engine=engine)
+    assert next(vm) == 5
+    snapshot = vm.snapshot()
+    vm.add_input(6)
+    assert vm.run() == [5, 6]
+    for value in [7, 8]:
+        restored = IntcodeVM.from_snapshot(snapshot, engine=engine)
+        restored.add_input(value)
+        assert restored.run() == [5, value]
+    assert snapshot.memory[0] == 5
+
+
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+def test_needs_input(engine):
+    # add two inputs and output the sum
+    vm = IntcodeVM([3, 11, 3, 12, 1, 11, 12, 13, 4, 13, 99, 0, 0, 0], [], engine=engine)
+    assert next(vm) is NEEDS_INPUT
+    assert next(vm) is NEEDS_INPUT  # still waiting, without having moved on
+    vm.add_input(2)
+    assert next(vm) is NEEDS_INPUT
+    vm.add_input(3)
+    assert next(vm) == 5
+    with pytest.raises(StopIteration):
+        next(vm)
+
+
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+def test_run_input_exhausted(engine):
+    vm = IntcodeVM([3, 0, 4, 0, 3, 0, 99], [1], engine=engine)
+    with pytest.raises(InputExhausted):
+        vm.run()
+    assert vm.outputs == [1]
+    assert vm.ip == 4
+
+
+@pytest.mark.parametrize('engine', [LADDER, TABLE])
+def test_resume(engine):
+    # output every input, forever
+    vm = IntcodeVM([3, 9, 4, 9, 1105, 1, 0, 99, 99, 0], [1, 2, 3], engine=engine)
+    assert vm.resume() is NEEDS_INPUT
+    assert vm.outputs == [1, 2, 3]
+    vm.write(99, 4)  # halt after the next output
+    vm.add_input(4)
+    assert vm.resume() is HALTED
+    assert vm.outputs == [1, 2, 3, 4]
@@ -1,5 +1,14 @@
 """Problem statement: https://adventofcode.com/2019/day/1"""
-from typing import List
+from typing import BinaryIO, Iterator, List, Tuple
+
+import numpy as np
+
+# bytes of the masses file read at a time
+CHUNK_SIZE = 1 << 23
+
+INT64_MAX = np.iinfo(np.int64).max
+# the most digits parse_masses() reads, so that every number fits in int64
+MAX_DIGITS = 18
 
 
 def fuel_required(mass: int) -> int:
@@ -31,10 +40,95 @@ def calc_modules_with_fuel(masses: List[int]) -> int:
     return total_fuel
 
 
-if __name__ == '__main__':
-    with open('day1.input', 'r') as inputs:
-        module_masses = [int(module) for module in inputs.readlines()]
-    modules_fuel = calc_modules_fuel(module_masses)
+def parse_masses(data: bytes) -> np.ndarray:
+    """Parse whitespace-separated masses of up to 18 digits from data, all at once, into an int64
+    array. Raise ValueError if data holds anything else (such as a sign, or a longer number)."""
+    chars = np.frombuffer(data, dtype=np.uint8)
+    is_digit = np.zeros(len(chars) + 2, dtype=bool)  # padded with a non-digit at each end
+    is_digit[1:-1] = chars - ord('0') < 10  # wraps around for bytes below '0'
+    is_space = ((chars == ord(' ')) | (chars == ord('\n')) | (chars == ord('\r'))
+                | (chars == ord('\t')))
+    if not (is_digit[1:-1] | is_space).all():
+        raise ValueError('Masses must be unsigned integers separated by whitespace')
+    # each number starts and ends where is_digit changes
+    starts, ends = np.flatnonzero(is_digit[1:] != is_digit[:-1]).reshape(-1, 2).T
+    lengths = ends - starts
+    if lengths.size and lengths.max() > MAX_DIGITS:
+        raise ValueError(f'Masses of more than {MAX_DIGITS} digits may not fit in int64')
+    masses = np.zeros(len(starts), dtype=np.int64)
+    # add up the digits of every mass at once, from the units up
+    for place in range(lengths.max() if lengths.size else 0):
+        has_digit = lengths > place
+        digits = chars[np.where(has_digit, ends - place - 1, 0)].astype(np.int64) - ord('0')
+        masses += np.where(has_digit, digits, 0) * 10 ** place
+    return masses
+
+
+def array_fuel(masses: np.ndarray) -> Tuple[int, int]:
+    """Return the fuel required for the given int64 array of module masses, without and with the
+    added mass of the fuel taken into account. Each round of the fuel calculation is applied to the
+    whole array at once, dropping modules as their fuel reaches zero. The masses must be small
+    enough for their sum not to overflow."""
+    fuel = masses // 3 - 2
+    fuel = fuel[fuel > 0]
+    modules_fuel = int(fuel.sum())
+    total_fuel = modules_fuel
+    while fuel.size:
+        fuel = fuel // 3 - 2
+        fuel = fuel[fuel > 0]
+        total_fuel += int(fuel.sum())
+    return modules_fuel, total_fuel
+
+
+def read_chunks(f: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Read f about chunk_size bytes at a time, always ending a chunk at the end of a line."""
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            return
+        yield data + f.readline()
+
+
+def calc_file_fuel(filename: str, chunk_size: int = CHUNK_SIZE) -> Tuple[int, int]:
+    """Return the fuel required for the module masses in the given file, one per line, without and
+    with the added mass of the fuel taken into account. The file is streamed a chunk at a time,
+    with the fuel for each chunk worked out by array_fuel(), except for masses that might overflow
+    int64, which are handled in Python."""
+    modules_fuel, total_fuel = 0, 0
+    with open(filename, 'rb') as f:
+        for data in read_chunks(f, chunk_size):
+            try:
+                masses = parse_masses(data)
+                large = []
+            except ValueError:
+                values = [int(value) for value in data.split()]
+                large = [value for value in values if abs(value) > INT64_MAX]
+                masses = np.array([value for value in values if abs(value) <= INT64_MAX],
+                                  dtype=np.int64)
+            # leave any masses big enough to overflow the sums to Python
+            too_large = masses > INT64_MAX // max(len(masses), 1)
+            if too_large.any():
+                large.extend(int(mass) for mass in masses[too_large])
+                masses = masses[~too_large]
+            chunk_fuel, chunk_total_fuel = array_fuel(masses)
+            modules_fuel += chunk_fuel + calc_modules_fuel(large)
+            total_fuel += chunk_total_fuel + calc_modules_with_fuel(large)
+    return modules_fuel, total_fuel
+
+
+def solve(filename: str) -> Tuple[int, int]:
+    """Solve both parts of the problem in one pass over the masses in the given file:
+
+    Return the fuel required for the modules alone, and the fuel required taking the added mass of
+    the fuel into account."""
+    return calc_file_fuel(filename)
+
+
+def main():
+    modules_fuel, modules_fuel_fuel = solve('day1.input')
     print(f'(Part 1): The total fuel needed for the modules is {modules_fuel}.')
-    modules_fuel_fuel = calc_modules_with_fuel(module_masses)
     print(f'(Part 2) The actual fuel needed to launch the modules is {modules_fuel_fuel}.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Tests for the day 1 solution in day1.py"""
+import random
+
+import numpy as np
+import pytest
+
+from day1 import (INT64_MAX, MAX_DIGITS, array_fuel, calc_file_fuel, calc_modules_fuel,
+                  calc_modules_with_fuel, fuel_required, parse_masses)
+
+
+@pytest.mark.parametrize('mass,fuel,with_fuel', [
+    (12, 2, 2), (14, 2, 2), (1969, 654, 966), (100756, 33583, 50346), (0, 0, 0), (8, 0, 0),
+])
+def test_examples(mass, fuel, with_fuel):
+    assert fuel_required(mass) == fuel
+    assert calc_modules_fuel([mass]) == fuel
+    assert calc_modules_with_fuel([mass]) == with_fuel
+    assert array_fuel(np.array([mass], dtype=np.int64)) == (fuel, with_fuel)
+
+
+def test_parse_masses():
+    assert parse_masses(b'12\n14\r\n1969 \t100756\n\n').tolist() == [12, 14, 1969, 100756]
+    assert parse_masses(b'007\n0').tolist() == [7, 0]
+    assert parse_masses(b'').tolist() == []
+    assert parse_masses(b'\n \n').tolist() == []
+    largest = int('9' * MAX_DIGITS)
+    assert parse_masses(f'{largest}\n1\n'.encode()).tolist() == [largest, 1]
+
+
+@pytest.mark.parametrize('data', [
+    b'-5\n', b'+5\n', b'12\n-14\n', b'1.5\n', b'12,14\n', b'12\n' + b'1' * (MAX_DIGITS + 1) + b'\n',
+])
+def test_parse_masses_rejects(data):
+    with pytest.raises(ValueError):
+        parse_masses(data)
+
+
+def write_masses(path, masses, newline='\n'):
+    path.write_bytes(newline.join(str(mass) for mass in masses).encode())
+    return str(path)
+
+
+def expected(masses):
+    masses = [int(mass) for mass in masses]
+    return calc_modules_fuel(masses), calc_modules_with_fuel(masses)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 1 << 23])
+def test_calc_file_fuel_chunks(chunk_size, tmp_path):
+    rng = random.Random(chunk_size)
+    masses = [rng.randrange(10 ** rng.randint(1, 7)) for _ in range(500)]
+    filename = write_masses(tmp_path / 'masses', masses)
+    assert calc_file_fuel(filename, chunk_size) == expected(masses)
+    # with a line break at the end, and Windows line breaks
+    filename = write_masses(tmp_path / 'masses', masses + [''], '\r\n')
+    assert calc_file_fuel(filename, chunk_size) == expected(masses)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 10, 1 << 23])
+def test_calc_file_fuel_large_masses(chunk_size, tmp_path):
+    masses = [
+        12, 10 ** 18 - 1, 10 ** 18, INT64_MAX, INT64_MAX + 1, 2 ** 64, 10 ** 30, 7 ** 100, 100756,
+        # large enough for their sum to overflow int64, without any of them overflowing
+        *[INT64_MAX // 3] * 5,
+    ]
+    filename = write_masses(tmp_path / 'masses', masses)
+    assert calc_file_fuel(filename, chunk_size) == expected(masses)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 10, 1 << 23])
+def test_calc_file_fuel_signs(chunk_size, tmp_path):
+    masses = ['+12', '-14', '1969', '-' + '9' * 25, '+' + '9' * 25, '-0', '+100756']
+    filename = write_masses(tmp_path / 'masses', masses)
+    assert calc_file_fuel(filename, chunk_size) == expected(masses)
+
+
+def test_calc_file_fuel_random(tmp_path):
+    rng = random.Random(1)
+    for _ in range(20):
+        masses = [rng.choice(['', '-', '+']) + str(rng.randrange(10 ** rng.randint(1, 25)))
+                  for _ in range(rng.randint(0, 50))]
+        filename = write_masses(tmp_path / 'masses', masses)
+        assert calc_file_fuel(filename, rng.randint(1, 100)) == expected(masses), masses
+
+
+def test_input_file():
+    with open('day1.input') as f:
+        masses = [int(line) for line in f]
+    assert calc_file_fuel('day1.input') == expected(masses) == (3448043, 5169198)
@@ -1,24 +1,38 @@
 """Problem statement: https://adventofcode.com/2019/day/2"""
+import itertools
+
 from Intcode import IntcodeVM
+from IntcodeLoader import load_program
+from IntcodeSearch import parallel_find
+
+
+def run_with(orig_vm, noun_verb):
+    """Run a fork of the given VM with the noun and verb set, and return the result of the
+    program."""
+    noun, verb = noun_verb
+    vm = orig_vm.fork()
+    vm.write(noun, 1)
+    vm.write(verb, 2)
+    vm.run()
+    return vm.memory[0]
+
+
+def solve_part1(program):
+    # we need the original program again for part 2, so run a fork of a VM that never runs itself
+    return run_with(IntcodeVM(program, []), (12, 2))
+
+
+def solve_part2(program):
+    noun_verbs = itertools.product(range(100), repeat=2)
+    return parallel_find(program, run_with, noun_verbs, 19690720)
+
+
+def main():
+    orig_program = load_program('day2.input')
+    print(f"The result of the program is {solve_part1(orig_program)}.")
+    noun, verb = solve_part2(orig_program)
+    print(f'The noun and verb that produce 19690720 are {noun=} and {verb=}.')
+
 
-# Solve part 1:
-with open('day2.input', 'r') as f:
-    orig_program = [int(val) for val in f.read().split(',')]
-# Set up state for problem:
-program = list(orig_program)  # we need the original program again for part 2, so copy it
-program[1] = 12
-program[2] = 2
-vm = IntcodeVM(program, [], [])
-vm.run()
-print(f"The result of the program is {program[0]}.")
-
-# Solve part 2:
-for noun in range(100):
-    for verb in range(100):
-        program = list(orig_program)
-        program[1] = noun
-        program[2] = verb
-        vm = IntcodeVM(program, [], [])
-        vm.run()
-        if program[0] == 19690720:
-            print(f'The noun and verb that produce 19690720 are {noun=} and {verb=}.')
+if __name__ == '__main__':
+    main()
@@ -1,87 +1,244 @@
 """Problem statement: https://adventofcode.com/2019/day/3"""
-from typing import List
+import bisect
+import itertools
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
 
+DIRECTIONS = {'R': (1, 0), 'L': (-1, 0), 'U': (0, 1), 'D': (0, -1)}
 
-def layout_wire(instructions: List[str]) -> List[tuple]:
-    """Lay out a wire on the grid, according to instructions, starting at (0, 0). Return a list of
-    the coordinates the wire touches, in order.
+
+class Segment(NamedTuple):
+    """A straight run of wire, starting one step after (x, y), the point the wire reached after
+    steps steps, and covering the points from (x_lo, y_lo) to (x_hi, y_hi) inclusive."""
+    x: int
+    y: int
+    steps: int
+    x_lo: int
+    x_hi: int
+    y_lo: int
+    y_hi: int
+    horizontal: bool
+
+
+def wire_segments(instructions: List[str]) -> List[Segment]:
+    """Lay out a wire on the grid, according to instructions, starting at (0, 0). Return its
+    segments, in order.
 
     The instructions given are strings like 'L8' and 'U20', a letter direction followed by an
     integer."""
-    walk = []
+    segments = []
     x, y = 0, 0
+    steps = 0
     for instruction in instructions:
-        direction, length = instruction[0], int(instruction[1:])
-        if direction == 'R':
-            for x in range(x+1, x+1+length):
-                walk.append((x, y))
-        elif direction == 'L':
-            for x in range(x-1, x-1-length, -1):
-                walk.append((x, y))
-        elif direction == 'U':
-            for y in range(y+1, y+1+length):
-                walk.append((x, y))
-        elif direction == 'D':
-            for y in range(y-1, y-1-length, -1):
-                walk.append((x, y))
-    return walk
-
-
-def length_to_coord(layout: List[tuple], coord: tuple) -> int:
-    """Return the distance a wire with the given layout travels to get to the given coordinates."""
-    length = 0
-    for location in layout:
-        length += 1
-        if location == coord:
-            return length
-    raise ValueError('The wire did not reach the given coordinates')
+        (dx, dy), length = DIRECTIONS[instruction[0]], int(instruction[1:])
+        if length == 0:
+            continue
+        end_x, end_y = x + dx * length, y + dy * length
+        segments.append(Segment(x, y, steps,
+                                min(x + dx, end_x), max(x + dx, end_x),
+                                min(y + dy, end_y), max(y + dy, end_y),
+                                dy == 0))
+        x, y = end_x, end_y
+        steps += length
+    return segments
+
+
+def segment_crossings(a: Segment, b: Segment) -> List[Tuple[int, int, int]]:
+    """Return the points where segments a and b of two wires meet, as (x, y, combined steps) tuples.
+    If the segments overlap along a line, only the points of the overlap that may be closest to the
+    central port or take the fewest combined steps are returned: its ends, the points on it closest
+    to the port (and next to it, since the port itself does not count), and the points on it
+    closest to where the wires start the segments."""
+    x_lo, x_hi = max(a.x_lo, b.x_lo), min(a.x_hi, b.x_hi)
+    y_lo, y_hi = max(a.y_lo, b.y_lo), min(a.y_hi, b.y_hi)
+    if x_lo > x_hi or y_lo > y_hi:
+        return []
+    xs = {min(max(x, x_lo), x_hi) for x in (x_lo, x_hi, -1, 0, 1, a.x, b.x)}
+    ys = {min(max(y, y_lo), y_hi) for y in (y_lo, y_hi, -1, 0, 1, a.y, b.y)}
+    return [(x, y, a.steps + abs(x - a.x) + abs(y - a.y) + b.steps + abs(x - b.x) + abs(y - b.y))
+            for x, y in itertools.product(xs, ys)]
+
+
+def _perpendicular_pairs(horizontals: List[Segment],
+                         verticals: List[Segment]) -> Iterator[Tuple[Segment, Segment]]:
+    """Yield every (horizontal, vertical) pair of segments that cross, sweeping a vertical line
+    across the grid from left to right."""
+    events = []  # (x, kind, segment): horizontals are added, then verticals checked, then removed
+    for num, segment in enumerate(horizontals):
+        events.append((segment.x_lo, 0, num))
+        events.append((segment.x_hi, 2, num))
+    for num, segment in enumerate(verticals):
+        events.append((segment.x, 1, num))
+    events.sort()
+    active = []  # (y, number) of the horizontals the sweep line is crossing, in order
+    for _, kind, num in events:
+        if kind == 0:
+            bisect.insort(active, (horizontals[num].y, num))
+        elif kind == 2:
+            del active[bisect.bisect_left(active, (horizontals[num].y, num))]
+        else:
+            vertical = verticals[num]
+            start = bisect.bisect_left(active, (vertical.y_lo, -1))
+            end = bisect.bisect_right(active, (vertical.y_hi, len(horizontals)))
+            for _, other in active[start:end]:
+                yield horizontals[other], vertical
+
+
+def _collinear_pairs(segments_a: List[Segment],
+                     segments_b: List[Segment]) -> Iterator[Tuple[Segment, Segment]]:
+    """Yield every (a, b) pair of segments that run along the same line and overlap."""
+    lines = defaultdict(list)  # (horizontal, line) -> (lo, hi, wire, segment)
+    for wire, segments in enumerate((segments_a, segments_b)):
+        for segment in segments:
+            if segment.horizontal:
+                lines[True, segment.y].append((segment.x_lo, segment.x_hi, wire, segment))
+            else:
+                lines[False, segment.x].append((segment.y_lo, segment.y_hi, wire, segment))
+    for spans in lines.values():
+        spans.sort(key=lambda span: span[0])
+        active = ([], [])  # spans of each wire that may still overlap later ones
+        for lo, hi, wire, segment in spans:
+            others = active[1 - wire]
+            others[:] = [span for span in others if span[1] >= lo]
+            for _, _, _, other in others:
+                yield (segment, other) if wire == 0 else (other, segment)
+            active[wire].append((lo, hi, wire, segment))
+
+
+def intersections(wire_a: List[str], wire_b: List[str]) -> Iterator[Tuple[int, int, int]]:
+    """Yield the points where the wires cross, as (x, y, combined steps) tuples (see
+    segment_crossings() for the points yielded where the wires run along each other). A point may
+    be yielded more than once if either wire passes it more than once."""
+    segments_a, segments_b = wire_segments(wire_a), wire_segments(wire_b)
+    pairs = itertools.chain(
+        _perpendicular_pairs([s for s in segments_a if s.horizontal],
+                             [s for s in segments_b if not s.horizontal]),
+        ((a, b) for b, a in _perpendicular_pairs([s for s in segments_b if s.horizontal],
+                                                 [s for s in segments_a if not s.horizontal])),
+        _collinear_pairs(segments_a, segments_b))
+    for a, b in pairs:
+        yield from segment_crossings(a, b)
+
+
+def solve(wire_a: List[str], wire_b: List[str]) -> Tuple[int, int]:
+    """Solve both parts of the problem in one pass:
+
+    Return the Manhattan distance from the central port to the closest intersection, and the
+    fewest combined steps the wires must take to reach an intersection."""
+    closest, fewest = None, None
+    for x, y, steps in intersections(wire_a, wire_b):
+        if (x, y) == (0, 0):
+            continue
+        distance = abs(x) + abs(y)
+        if closest is None or distance < closest:
+            closest = distance
+        if fewest is None or steps < fewest:
+            fewest = steps
+    if closest is None:
+        raise ValueError('The wires do not cross')
+    return closest, fewest
+
+
+class SegmentIndex:
+    """A spatial index of the segments of any number of wires: a grid of square buckets, cell_size
+    wide, each listing the (wire number, segment) pairs that pass through it. By default, cells are
+    as wide as the median segment is long, so that most segments fall in one or two buckets."""
+    def __init__(self, wires: List[List[Segment]], cell_size: int = None):
+        if cell_size is None:
+            lengths = sorted(max(segment.x_hi - segment.x_lo, segment.y_hi - segment.y_lo) + 1
+                             for segments in wires for segment in segments)
+            cell_size = lengths[len(lengths) // 2] if lengths else 1
+        self.cell_size = cell_size
+        self.buckets = defaultdict(list)  # (column, row) -> [(wire number, segment)]
+        for wire, segments in enumerate(wires):
+            for segment in segments:
+                for column in range(segment.x_lo // cell_size, segment.x_hi // cell_size + 1):
+                    for row in range(segment.y_lo // cell_size, segment.y_hi // cell_size + 1):
+                        self.buckets[column, row].append((wire, segment))
+
+
+PairResults = Dict[Tuple[int, int], Tuple[int, int]]
+
+
+def _bucket_results(cell_size: int, buckets: List[tuple]) -> PairResults:
+    """Return the closest intersection to the central port and the fewest combined steps to an
+    intersection for every pair of wires crossing in the given (key, entries) buckets, keyed by the
+    pair's wire numbers, lowest first."""
+    results = {}
+    for key, entries in buckets:
+        for (wire_a, a), (wire_b, b) in itertools.combinations(entries, 2):
+            if wire_a == wire_b:
+                continue
+            x_lo, y_lo = max(a.x_lo, b.x_lo), max(a.y_lo, b.y_lo)
+            if x_lo > min(a.x_hi, b.x_hi) or y_lo > min(a.y_hi, b.y_hi):
+                continue
+            # segments that meet in several buckets only count in the one where their overlap starts
+            if (x_lo // cell_size, y_lo // cell_size) != key:
+                continue
+            pair = (wire_a, wire_b) if wire_a < wire_b else (wire_b, wire_a)
+            for x, y, steps in segment_crossings(a, b):
+                if (x, y) == (0, 0):
+                    continue
+                distance = abs(x) + abs(y)
+                try:
+                    closest, fewest = results[pair]
+                except KeyError:
+                    results[pair] = distance, steps
+                else:
+                    results[pair] = min(closest, distance), min(fewest, steps)
+    return results
+
+
+def pairwise_solve(wires: List[List[str]], max_workers: Optional[int] = 1, chunksize: int = 256,
+                   cell_size: int = None) -> PairResults:
+    """Solve both parts of the problem for every pair of the given wires that cross, through a
+    SegmentIndex of all of them. Return {(wire number, wire number): (closest, fewest)}, with the
+    lower wire number first.
+
+    The index has cells cell_size wide (see SegmentIndex). Its buckets are evaluated chunksize at
+    a time, by a pool of max_workers processes (as many as there are cores if None), or in this
+    process if max_workers is 1."""
+    index = SegmentIndex([wire_segments(wire) for wire in wires], cell_size)
+    buckets = [(key, entries) for key, entries in index.buckets.items() if len(entries) > 1]
+    chunks = [buckets[start:start + chunksize] for start in range(0, len(buckets), chunksize)]
+    if max_workers == 1:
+        partials = [_bucket_results(index.cell_size, chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers) as pool:
+            partials = list(pool.map(_bucket_results, itertools.repeat(index.cell_size), chunks))
+    results = {}
+    for partial in partials:
+        for pair, (closest, fewest) in partial.items():
+            if pair in results:
+                closest = min(closest, results[pair][0])
+                fewest = min(fewest, results[pair][1])
+            results[pair] = closest, fewest
+    return results
 
 
 def solve_part1(wire_a: List[str], wire_b: List[str]) -> int:
     """Solve part 1 of the problem:
 
     Return the Manhattan distance from the central port to the closest intersection."""
-    a_walk = layout_wire(wire_a)
-    b_walk = layout_wire(wire_b)
-    a_coords = set(a_walk)
-    b_coords = set(b_walk)
-    intersections = a_coords.intersection(b_coords)
-    lowest = 1_000_000
-    for x, y in intersections:
-        combined_distance = abs(x) + abs(y)
-        if combined_distance < lowest:
-            lowest = combined_distance
-    return lowest
+    return solve(wire_a, wire_b)[0]
 
 
 def solve_part2(wire_a: List[str], wire_b: List[str]) -> int:
     """Solve part 2 of the problem:
 
     Return the fewest combined steps the wires must take to reach an intersection."""
-    a_walk = layout_wire(wire_a)
-    b_walk = layout_wire(wire_b)
-    a_coords = set(a_walk)
-    b_coords = set(b_walk)
-    intersections = a_coords.intersection(b_coords)
-    lengths = {}
-    for intersection in intersections:
-        a_length_to = length_to_coord(a_walk, intersection)
-        b_length_to = length_to_coord(b_walk, intersection)
-        lengths[intersection] = (a_length_to, b_length_to)
-    lowest = 1_000_000_000
-    for intersection, lengthpair in lengths.items():
-        x, y = lengthpair
-        combined_distance = x + y
-        if combined_distance < lowest:
-            lowest = combined_distance
-    return lowest
+    return solve(wire_a, wire_b)[1]
 
 
-if __name__ == '__main__':
+def main():
     with open('day3.input', 'r') as f:
         a = f.readline().split(',')
         b = f.readline().split(',')
-    answer = solve_part1(a, b)
-    print(f'The Manhattan distance from the central port to the closest intersection is {answer}.')
-    answer = solve_part2(a, b)
-    print(f'The fewest combined steps the wires must take to reach an intersection is {answer}.')
+    answer1, answer2 = solve(a, b)
+    print(f'The Manhattan distance from the central port to the closest intersection is {answer1}.')
+    print(f'The fewest combined steps the wires must take to reach an intersection is {answer2}.')
+
+
+if __name__ == '__main__':
+    main()
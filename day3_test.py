@@ -0,0 +1,143 @@
+"""Tests for the day 3 solution in day3.py"""
+import random
+
+import pytest
+
+from day3 import (DIRECTIONS, SegmentIndex, _bucket_results, pairwise_solve, segment_crossings,
+                  solve, wire_segments)
+
+EXAMPLES = [
+    ['R8,U5,L5,D3', 'U7,R6,D4,L4', 6, 30],
+    ['R75,D30,R83,U83,L12,D49,R71,U7,L72', 'U62,R66,U55,R34,D71,R55,D58,R83', 159, 610],
+    ['R98,U47,R26,D63,R33,U87,L62,D20,R33,U53,R51', 'U98,R91,D20,R16,D67,R40,U7,R15,U6,R7', 135,
+     410],
+]
+
+
+def brute_force(wire_a, wire_b):
+    """Solve both parts by laying out both wires a point at a time."""
+    visited = []
+    for wire in (wire_a, wire_b):
+        points = {}
+        x, y, steps = 0, 0, 0
+        for instruction in wire:
+            dx, dy = DIRECTIONS[instruction[0]]
+            for _ in range(int(instruction[1:])):
+                x, y, steps = x + dx, y + dy, steps + 1
+                points.setdefault((x, y), steps)
+        visited.append(points)
+    crossings = [(point, visited[0][point] + visited[1][point])
+                 for point in visited[0].keys() & visited[1].keys() if point != (0, 0)]
+    if not crossings:
+        return None
+    return (min(abs(x) + abs(y) for (x, y), _ in crossings),
+            min(steps for _, steps in crossings))
+
+
+@pytest.mark.parametrize('wire_a,wire_b,closest,fewest', EXAMPLES)
+def test_examples(wire_a, wire_b, closest, fewest):
+    assert solve(wire_a.split(','), wire_b.split(',')) == (closest, fewest)
+
+
+@pytest.mark.parametrize('wire_a,wire_b', [
+    # running along each other in the same direction, from the central port
+    ['R10', 'R5'],
+    # running along each other in opposite directions
+    ['R10', 'U2,R5,D2,L3'],
+    # an overlap away from both axes, reached by the wires from different sides
+    ['U3,R10', 'R4,U3,R2'],
+    ['U3,R10', 'R12,U3,L9'],
+    # an overlap crossing the axes, and passing through the central port
+    ['D5,L5,U10,R3', 'D2,L7,U4,R20'],
+    ['L5,R10', 'R5,L10'],
+    # a wire crossing itself on the overlap
+    ['U2,R6', 'R3,U2,L2,D1,R4,U1,R3'],
+])
+def test_overlaps(wire_a, wire_b):
+    wire_a, wire_b = wire_a.split(','), wire_b.split(',')
+    assert solve(wire_a, wire_b) == brute_force(wire_a, wire_b)
+
+
+def test_overlap_crossings():
+    a, = wire_segments(['R10'])
+    b, = wire_segments(['R3', 'U2', 'L4', 'D2', 'R6'])[-1:]  # from (-1, 0) to (5, 0)
+    crossings = {(x, y): steps for x, y, steps in segment_crossings(a, b)}
+    # both ends of the overlap, and the points next to the central port
+    assert set(crossings) >= {(1, 0), (5, 0)}
+    assert crossings[1, 0] == 1 + 13
+    assert crossings[5, 0] == 5 + 17
+
+
+def test_no_crossing():
+    with pytest.raises(ValueError):
+        solve(['U5'], ['D5'])
+
+
+def test_random_wires():
+    rng = random.Random(3)
+    checked = 0
+    while checked < 1000:
+        wire_a, wire_b = ([f'{rng.choice("RLUD")}{rng.randint(0, 8)}'
+                           for _ in range(rng.randint(1, 10))] for _ in range(2))
+        want = brute_force(wire_a, wire_b)
+        if want is None:
+            with pytest.raises(ValueError):
+                solve(wire_a, wire_b)
+        else:
+            assert solve(wire_a, wire_b) == want, (wire_a, wire_b)
+            checked += 1
+
+
+def pairwise_brute_force(wires):
+    results = {}
+    for a in range(len(wires)):
+        for b in range(a + 1, len(wires)):
+            result = brute_force(wires[a], wires[b])
+            if result is not None:
+                results[a, b] = result
+    return results
+
+
+def random_wires(rng, count):
+    return [[f'{rng.choice("RLUD")}{rng.randint(1, 12)}' for _ in range(rng.randint(1, 12))]
+            for _ in range(count)]
+
+
+def test_segment_index():
+    wires = [wire_segments(['R10', 'U3']), wire_segments(['U5', 'L2'])]
+    index = SegmentIndex(wires, cell_size=4)
+    assert index.cell_size == 4
+    # R10 covers (1, 0) to (10, 0): columns 0 to 2, row 0
+    assert [key for key, entries in index.buckets.items() if entries[0] == (0, wires[0][0])] \
+        == [(0, 0), (1, 0), (2, 0)]
+    # L2 covers (-2, 5) to (-1, 5): column -1, row 1
+    assert index.buckets[-1, 1] == [(1, wires[1][1])]
+    assert SegmentIndex(wires).cell_size == 5  # the median segment length
+
+
+@pytest.mark.parametrize('cell_size', [1, 2, 3, 7, 50, None])
+def test_pairwise_solve(cell_size):
+    rng = random.Random(cell_size)
+    for _ in range(20):
+        wires = random_wires(rng, 6)
+        assert pairwise_solve(wires, cell_size=cell_size) == pairwise_brute_force(wires)
+
+
+def test_pairwise_solve_long_overlaps():
+    # the wires run along each other across many cells, on both sides of the axes
+    wires = [['L30', 'R60'], ['D1', 'L25', 'U1', 'R50'], ['U9', 'R20', 'D9', 'L40']]
+    for cell_size in (1, 4, 100):
+        assert pairwise_solve(wires, cell_size=cell_size) == pairwise_brute_force(wires)
+
+
+def test_overlap_counted_in_one_bucket():
+    # the overlap covers (1, 0) to (20, 0), across buckets (0, 0) to (5, 0), and starts in (0, 0)
+    index = SegmentIndex([wire_segments(['R20']), wire_segments(['R25'])], cell_size=4)
+    results = {key: _bucket_results(4, [(key, entries)]) for key, entries in index.buckets.items()}
+    assert {key: result for key, result in results.items() if result} == {(0, 0): {(0, 1): (1, 2)}}
+
+
+def test_pairwise_solve_in_processes():
+    wires = random_wires(random.Random(1), 12)
+    assert pairwise_solve(wires, max_workers=2, chunksize=4, cell_size=3) \
+        == pairwise_brute_force(wires)
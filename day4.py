@@ -1,5 +1,11 @@
 """Problem statement: https://adventofcode.com/2019/day/4"""
 import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import NamedTuple, Optional, TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np  # imported where needed, so that importing day 4 stays cheap
 
 DAY4_INPUT = '206938-679128'
 
@@ -48,38 +54,245 @@ def is_password_valid_part2(password: str) -> bool:
     return True
 
 
-def solve_part1(num_range: str) -> int:
-    """Return the number of valid passwords within num_range (given as a string 'XXXXXX-YYYYYY').
+class Scan(NamedTuple):
+    """What the rules need to know about a password, gathered in one pass over its digits."""
+    length: int
+    non_decreasing: bool
+    runs: Tuple[int, ...]  # the lengths of the runs of equal adjacent digits, in order
 
-    Use the simple validity criteria from problem part 1."""
-    start, stop = num_range.split('-')
-    start = int(start)
-    stop = int(stop)
-    total = 0
-    for password in range(start, stop+1):
-        password = str(password)
-        if is_password_valid_part1(password):
-            total += 1
+
+class BatchScan(NamedTuple):
+    """What the rules need to know about an array of passwords, gathered with array operations."""
+    lengths: 'np.ndarray'  # the number of digits of each password
+    non_decreasing: 'np.ndarray'
+    run_ends: 'np.ndarray'  # for each password and digit, the length of the run ending there, or 0
+
+
+def scan(password: str) -> Optional[Scan]:
+    """Scan a password, or return None if it is not made of digits."""
+    if not (password.isascii() and password.isdigit()):
+        return None
+    runs = []
+    run = 0
+    non_decreasing = True
+    previous = None
+    for digit in password:
+        if digit == previous:
+            run += 1
+            continue
+        if previous is not None:
+            runs.append(run)
+            if digit < previous:
+                non_decreasing = False
+        previous = digit
+        run = 1
+    if run:
+        runs.append(run)
+    return Scan(len(password), non_decreasing, tuple(runs))
+
+
+def scan_batch(passwords: 'np.ndarray') -> BatchScan:
+    """Scan an array of non-negative integer passwords at once."""
+    import numpy as np
+    passwords = np.asarray(passwords, dtype=np.int64)
+    if passwords.size and passwords.min() < 0:
+        raise ValueError('Passwords must not be negative')
+    width = len(str(int(passwords.max()))) if passwords.size else 1
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    digits = passwords[:, None] // powers % 10  # one column per digit, most significant first
+    lengths = np.maximum((passwords[:, None] >= powers).sum(axis=1), 1)
+    used = np.arange(width) >= width - lengths[:, None]  # False for the zeros padding the left
+    non_decreasing = ((digits[:, 1:] >= digits[:, :-1]) | ~used[:, :-1]).all(axis=1)
+    same = np.zeros_like(used)  # whether each digit is the same as the one before it
+    same[:, 1:] = used[:, :-1] & (digits[:, 1:] == digits[:, :-1])
+    runs = np.zeros(digits.shape, dtype=np.int64)  # the length of the run so far at each digit
+    run = np.zeros(len(passwords), dtype=np.int64)
+    for column in range(width):
+        run = np.where(same[:, column], run + 1, used[:, column])
+        runs[:, column] = run
+    ends = used.copy()  # whether a run ends at each digit
+    ends[:, :-1] &= ~same[:, 1:]
+    return BatchScan(lengths, non_decreasing, np.where(ends, runs, 0))
+
+
+class Rule(ABC):
+    """A password validity rule, checking either one scanned password or a scanned batch of them.
+    Rules are combined into a Policy."""
+    @abstractmethod
+    def check(self, scanned: Scan) -> bool:
+        """Return whether the scanned password meets the rule."""
+
+    @abstractmethod
+    def check_batch(self, scanned: BatchScan) -> 'np.ndarray':
+        """Return a boolean array of which of the scanned passwords meet the rule."""
+
+
+class DigitCount(Rule):
+    """The password has exactly the given number of digits."""
+    def __init__(self, digits: int):
+        self.digits = digits
+
+    def check(self, scanned: Scan) -> bool:
+        return scanned.length == self.digits
+
+    def check_batch(self, scanned: BatchScan) -> 'np.ndarray':
+        return scanned.lengths == self.digits
+
+
+class NonDecreasing(Rule):
+    """Going from left to right, the digits never decrease."""
+    def check(self, scanned: Scan) -> bool:
+        return scanned.non_decreasing
+
+    def check_batch(self, scanned: BatchScan) -> 'np.ndarray':
+        return scanned.non_decreasing
+
+
+class HasRun(Rule):
+    """Some run of equal adjacent digits is between min_length and max_length digits long (with no
+    upper limit if max_length is None)."""
+    def __init__(self, min_length: int = 2, max_length: int = None):
+        self.min_length = min_length
+        self.max_length = max_length
+
+    def check(self, scanned: Scan) -> bool:
+        return any(self.min_length <= run and (self.max_length is None or run <= self.max_length)
+                   for run in scanned.runs)
+
+    def check_batch(self, scanned: BatchScan) -> 'np.ndarray':
+        matches = scanned.run_ends >= self.min_length
+        if self.max_length is not None:
+            matches &= scanned.run_ends <= self.max_length
+        return matches.any(axis=1)
+
+
+class Policy:
+    """A combination of rules that a valid password must all meet. Calling a policy checks one
+    password, scanning it only once whatever the number of rules; batch() checks an array of
+    them."""
+    def __init__(self, *rules: Rule):
+        self.rules = rules
+
+    def __call__(self, password: str) -> bool:
+        scanned = scan(password)
+        return scanned is not None and all(rule.check(scanned) for rule in self.rules)
+
+    def batch(self, passwords: 'np.ndarray') -> 'np.ndarray':
+        """Return a boolean array of which of the given integer passwords are valid."""
+        import numpy as np
+        scanned = scan_batch(passwords)
+        valid = np.ones(len(scanned.lengths), dtype=bool)
+        for rule in self.rules:
+            valid &= rule.check_batch(scanned)
+        return valid
+
+
+PART1_POLICY = Policy(DigitCount(6), NonDecreasing(), HasRun(2))
+PART2_POLICY = Policy(DigitCount(6), NonDecreasing(), HasRun(2, 2))
+
+
+# a run of 3 or more equal digits is counted as a run of 3
+LONG_RUN = 3
+
+
+def _has_pair(run: int, exact_pair: bool) -> bool:
+    """Return whether a run of run equal digits meets the double-digit criterion."""
+    return run == 2 if exact_pair else run >= 2
+
+
+@lru_cache(maxsize=None)
+def _completions(remaining: int, last: int, run: int, found: bool, exact_pair: bool) -> int:
+    """Return the number of ways to append remaining digits, none smaller than last, to a password
+    whose last digit is last and ends in a run of run equal digits, such that the password ends up
+    valid. found is whether the password already has a double digit."""
+    if remaining == 0:
+        return int(found or _has_pair(run, exact_pair))
+    total = _completions(remaining - 1, last, min(run + 1, LONG_RUN), found, exact_pair)
+    found = found or _has_pair(run, exact_pair)
+    for digit in range(last + 1, 10):
+        total += _completions(remaining - 1, digit, 1, found, exact_pair)
     return total
 
 
-def solve_part2(num_range: str) -> int:
-    """Return the number of valid passwords within num_range (given as a string 'XXXXXX-YYYYYY').
+def _count_up_to(limit: int, digits: int, exact_pair: bool) -> int:
+    """Return the number of valid passwords of the given number of digits that are at most
+    limit."""
+    if limit < 10 ** (digits - 1):
+        return 0
+    bound = [int(digit) for digit in str(min(limit, 10 ** digits - 1))]
+    total = 0
+    last, run, found = 1, 0, False  # the first digit can't be 0
+    # follow the digits of bound, counting the passwords that are below it from each position on
+    for position, bound_digit in enumerate(bound):
+        remaining = digits - position - 1
+        for digit in range(last, bound_digit):
+            if digit == last:
+                total += _completions(remaining, digit, min(run + 1, LONG_RUN), found, exact_pair)
+            else:
+                total += _completions(remaining, digit, 1, found or _has_pair(run, exact_pair),
+                                      exact_pair)
+        if bound_digit < last:
+            return total  # every password with the digits of bound so far is out of order
+        if bound_digit == last:
+            run = min(run + 1, LONG_RUN)
+        else:
+            found = found or _has_pair(run, exact_pair)
+            last, run = bound_digit, 1
+    return total + int(found or _has_pair(run, exact_pair))  # bound itself
+
+
+def count_passwords(start: int, stop: int, digits: int = 6, exact_pair: bool = False) -> int:
+    """Return the number of passwords of the given number of digits between start and stop
+    (inclusive) whose digits never decrease from left to right and that have two adjacent equal
+    digits. If exact_pair is true, two of the adjacent equal digits must not be part of a larger
+    group of equal digits.
+
+    The count is worked out digit by digit, without going through the passwords, so it takes time
+    proportional to the number of digits, whatever the size of the range."""
+    if start > stop:
+        return 0
+    return (_count_up_to(stop, digits, exact_pair)
+            - _count_up_to(start - 1, digits, exact_pair))
 
-    Use the extended validity criteria from problem part 2."""
-    start, stop = num_range.split('-')
-    start = int(start)
-    stop = int(stop)
+
+def count_brute_force(start: int, stop: int, is_valid) -> int:
+    """Return the number of passwords between start and stop (inclusive) that is_valid accepts,
+    by checking every one of them."""
     total = 0
     for password in range(start, stop + 1):
-        password = str(password)
-        if is_password_valid_part2(password):
+        if is_valid(str(password)):
             total += 1
     return total
 
 
-if __name__ == '__main__':
+def solve_part1(num_range: str, brute_force: bool = False) -> int:
+    """Return the number of valid passwords within num_range (given as a string 'XXXXXX-YYYYYY').
+
+    Use the simple validity criteria from problem part 1. If brute_force is true, check every
+    password in the range instead of counting them."""
+    start, stop = (int(val) for val in num_range.split('-'))
+    if brute_force:
+        return count_brute_force(start, stop, is_password_valid_part1)
+    return count_passwords(start, stop)
+
+
+def solve_part2(num_range: str, brute_force: bool = False) -> int:
+    """Return the number of valid passwords within num_range (given as a string 'XXXXXX-YYYYYY').
+
+    Use the extended validity criteria from problem part 2. If brute_force is true, check every
+    password in the range instead of counting them."""
+    start, stop = (int(val) for val in num_range.split('-'))
+    if brute_force:
+        return count_brute_force(start, stop, is_password_valid_part2)
+    return count_passwords(start, stop, exact_pair=True)
+
+
+def main():
     answer = solve_part1(DAY4_INPUT)
     print(f'{answer} different passwords within the range {DAY4_INPUT} meet the Part 1 criteria.')
     answer = solve_part2(DAY4_INPUT)
     print(f'{answer} different passwords within the range {DAY4_INPUT} meet the Part 2 criteria.')
+
+
+if __name__ == '__main__':
+    main()
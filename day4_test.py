@@ -0,0 +1,68 @@
+"""Tests for the day 4 solution in day4.py"""
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+import day4
+from day4 import (DigitCount, HasRun, NonDecreasing, PART1_POLICY, PART2_POLICY, Policy, Rule,
+                  count_brute_force, count_passwords, is_password_valid_part1,
+                  is_password_valid_part2)
+
+
+@pytest.mark.parametrize('exact_pair,is_valid',
+                         [(False, is_password_valid_part1), (True, is_password_valid_part2)])
+def test_count_passwords(exact_pair, is_valid):
+    for start, stop in [(111111, 111111), (111110, 111122), (206938, 216938), (99000, 130000)]:
+        assert count_passwords(start, stop, exact_pair=exact_pair) \
+            == count_brute_force(start, stop, is_valid)
+
+
+@pytest.mark.parametrize('exact_pair', [False, True])
+def test_count_passwords_random_ranges(exact_pair):
+    rng = random.Random(4)
+    for _ in range(200):
+        digits = rng.randint(1, 5)
+        start = rng.randrange(10 ** (digits + 1))
+        stop = start + rng.randrange(-10, 2000)
+        policy = Policy(DigitCount(digits), NonDecreasing(), HasRun(2, 2 if exact_pair else None))
+        assert count_passwords(start, stop, digits, exact_pair) \
+            == count_brute_force(start, stop, policy), (start, stop, digits)
+
+
+def test_count_passwords_empty_range():
+    assert count_passwords(500, 100, 3) == count_brute_force(500, 100, is_password_valid_part1) == 0
+    assert count_passwords(112, 111, 3) == 0
+
+
+@pytest.mark.parametrize('policy,is_valid',
+                         [(PART1_POLICY, is_password_valid_part1),
+                          (PART2_POLICY, is_password_valid_part2)])
+def test_batch_policies(policy, is_valid):
+    np = pytest.importorskip('numpy')
+    rng = random.Random(18)
+    passwords = list(range(99000, 130000)) + [rng.randrange(10 ** 7) for _ in range(20000)] \
+        + [0, 111111, 111122, 112233, 123444, 999999]
+    valid = policy.batch(np.array(passwords))
+    assert valid.tolist() == [is_valid(str(password)) for password in passwords]
+
+
+def test_import_without_numpy():
+    # day 4 imports NumPy only for batch checks, so that a plain run of it starts quickly
+    code = ('import sys, day4\n'
+            'assert "numpy" not in sys.modules\n'
+            'print(day4.count_passwords(1, 99, 2))')
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(day4.__file__),
+                            capture_output=True, text=True, check=True)
+    assert result.stdout == '9\n'
+
+
+def test_rules_must_check_batches():
+    class Odd(Rule):
+        def check(self, scanned):
+            return scanned.length % 2 == 1
+
+    with pytest.raises(TypeError):
+        Odd()
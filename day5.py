@@ -1,5 +1,6 @@
 """Problem statement: https://adventofcode.com/2019/day/5"""
-from Intcode import IntcodeVM
+from Intcode import IntcodeVM, fork_memory
+from IntcodeLoader import load_program
 
 
 def solve_part1(program):
@@ -17,13 +18,12 @@ def solve_part2(program):
 
 
 def main():
-    with open('day5.input', 'r') as f:
-        orig_program = list(int(val) for val in f.read().split(','))
-    program_copy = list(orig_program)
+    orig_program = load_program('day5.input')
+    program_copy = fork_memory(orig_program)
     answer1 = solve_part1(program_copy)
     print(f'The diagnostic tests returned {answer1[:-1]} (zeroes indicate passes).'
           f' The diagnostic code for input 1 was {answer1[-1]}.')
-    program_copy = list(orig_program)
+    program_copy = fork_memory(orig_program)
     answer2 = solve_part2(program_copy)
     print(f'The diagnostic code for input 5 was {answer2[-1]}.')
 
@@ -1,10 +1,12 @@
 """Problem statement: https://adventofcode.com/2019/day/6"""
+from array import array
+from typing import Dict, Iterable, List
 
 
 def build_orbit_mapping(lines):
     """Read lines in the format 'A)B' and return a dict mapping B:A."""
     mapping = {}
-    for orbit in orbits_input:
+    for orbit in lines:
         orbit = orbit.strip()
         center, outer = orbit.split(')')
         mapping[outer] = center
@@ -29,20 +31,145 @@ def get_chain(mapping, outer):
     return list(chain)
 
 
-if __name__ == '__main__':
+class OrbitMap:
+    """The orbits of a system, with the depth of every body: the number of orbits linking it to the
+    system's center, a body that orbits nothing.
+
+    Body names are interned to integer ids as they are read, and the body each one orbits is kept
+    in an array('l') indexed by id (-1 for the center), so every traversal runs over ints. Depths
+    are found without recursion, walking from each body only as far in as the nearest body whose
+    depth is already known, so every orbit is followed once."""
+    def __init__(self, mapping: Dict[str, str] = None):
+        self.ids: Dict[str, int] = {}  # body name -> id
+        self.names: List[str] = []  # id -> body name
+        self.parents = array('l')  # id -> id of the body it orbits, or -1
+        self.depths = array('l')  # id -> depth; filled in by _find_depths()
+        # _ancestors[k] maps every body to the body 2**k orbits further in (or to the center, for
+        # bodies closer to it than that); built by the first query that needs it
+        self._ancestors: List[array] = []
+        if mapping is not None:
+            for outer, center in mapping.items():
+                self._add_orbit(center, outer)
+            self._find_depths()
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> 'OrbitMap':
+        """Read lines in the format 'A)B' one at a time (such as from an open file), without
+        keeping them."""
+        orbit_map = cls()
+        for orbit in lines:
+            orbit = orbit.strip()
+            if orbit:
+                center, outer = orbit.split(')')
+                orbit_map._add_orbit(center, outer)
+        orbit_map._find_depths()
+        return orbit_map
+
+    def _intern(self, name: str) -> int:
+        body = self.ids.get(name)
+        if body is None:
+            body = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.parents.append(-1)
+        return body
+
+    def _add_orbit(self, center: str, outer: str):
+        self.parents[self._intern(outer)] = self._intern(center)
+
+    def _find_depths(self):
+        parents = self.parents
+        depths = self.depths = array('l', [-1]) * len(parents)
+        for body in range(len(parents)):
+            path = []  # bodies between this one and the nearest one with a known depth
+            while depths[body] < 0:
+                if parents[body] < 0:  # the center
+                    depths[body] = 0
+                    break
+                path.append(body)
+                body = parents[body]
+            depth = depths[body]
+            for outer in reversed(path):
+                depth += 1
+                depths[outer] = depth
+
+    @property
+    def total_orbits(self) -> int:
+        """The number of direct plus indirect orbits in the system."""
+        return sum(self.depths)
+
+    def depth(self, body: str) -> int:
+        return self.depths[self.ids[body]]
+
+    def _build_ancestors(self):
+        level = array('l', (body if parent < 0 else parent
+                            for body, parent in enumerate(self.parents)))
+        self._ancestors = [level]
+        for _ in range(max(self.depths, default=0).bit_length() - 1):
+            level = array('l', (level[ancestor] for ancestor in level))
+            self._ancestors.append(level)
+
+    def _common_center(self, a: int, b: int) -> int:
+        if not self._ancestors:
+            self._build_ancestors()
+        depths = self.depths
+        if depths[a] < depths[b]:
+            a, b = b, a
+        # lift a to the depth of b
+        orbits = depths[a] - depths[b]
+        for k in range(orbits.bit_length()):
+            if orbits >> k & 1:
+                a = self._ancestors[k][a]
+        if a == b:
+            return a
+        for level in reversed(self._ancestors):
+            if level[a] != level[b]:
+                a, b = level[a], level[b]
+        return self._ancestors[0][a]
+
+    def common_center(self, a: str, b: str) -> str:
+        """Return the outermost body that both a and b orbit, directly or indirectly (or a or b
+        itself, if one orbits the other), in O(log depth) time by binary lifting."""
+        return self.names[self._common_center(self.ids[a], self.ids[b])]
+
+    def _distance(self, a: int, b: int) -> int:
+        return self.depths[a] + self.depths[b] - 2 * self.depths[self._common_center(a, b)]
+
+    def distance(self, a: str, b: str) -> int:
+        """Return the number of orbits linking bodies a and b."""
+        return self._distance(self.ids[a], self.ids[b])
+
+    def transfers(self, a: str, b: str) -> int:
+        """Return the number of orbital transfers needed to move from the body a orbits to the body
+        b orbits. Raise ValueError if a or b orbits nothing."""
+        centers = self.parents[self.ids[a]], self.parents[self.ids[b]]
+        for body, center in zip((a, b), centers):
+            if center < 0:
+                raise ValueError(f'{body} does not orbit anything')
+        return self._distance(*centers)
+
+
+def solve_part1(orbit_map: OrbitMap) -> int:
+    """Solve part 1 of the problem:
+
+    Return the total number of direct and indirect orbits in the map."""
+    return orbit_map.total_orbits
+
+
+def solve_part2(orbit_map: OrbitMap) -> int:
+    """Solve part 2 of the problem:
+
+    Return the number of orbital transfers needed to move from the object YOU are orbiting to the
+    object SAN is orbiting."""
+    return orbit_map.transfers('YOU', 'SAN')
+
+
+def main():
     with open('day6.input', 'r') as f:
-        orbits_input = f.readlines()
-    orbits = build_orbit_mapping(orbits_input)
-    total_orbits = 0
-    for obj in orbits:
-        total_orbits += count_orbits(orbits, obj)
-    print(f'The number of direct plus indirect orbits in the system is {total_orbits}.')
-
-    my_chain = get_chain(orbits, 'YOU')
-    san_chain = get_chain(orbits, 'SAN')
-    # find the point at which the orbital chains diverge:
-    while my_chain[-1] == san_chain[-1]:
-        my_chain.pop()
-        san_chain.pop()
-    transfers = len(my_chain) + len(san_chain)
+        orbit_map = OrbitMap.from_lines(f)
+    print(f'The number of direct plus indirect orbits in the system is {solve_part1(orbit_map)}.')
+    transfers = solve_part2(orbit_map)
     print(f'The number of orbital transfers between you and Santa is {transfers}.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Tests for the day 6 solution in day6.py"""
+import random
+
+import pytest
+
+from day6 import OrbitMap, build_orbit_mapping, count_orbits, get_chain, solve_part1, solve_part2
+
+EXAMPLE = ['COM)B', 'B)C', 'C)D', 'D)E', 'E)F', 'B)G', 'G)H', 'D)I', 'E)J', 'J)K', 'K)L']
+
+
+def test_example_part1():
+    orbit_map = OrbitMap.from_lines(EXAMPLE)
+    assert solve_part1(orbit_map) == 42
+    assert OrbitMap(build_orbit_mapping(EXAMPLE)).total_orbits == 42
+    assert orbit_map.depth('D') == 3
+    assert orbit_map.depth('L') == 7
+    assert orbit_map.depth('COM') == 0
+
+
+def test_example_part2():
+    orbit_map = OrbitMap.from_lines(EXAMPLE + ['K)YOU', 'I)SAN'])
+    assert solve_part2(orbit_map) == 4
+    assert orbit_map.common_center('YOU', 'SAN') == 'D'
+    assert orbit_map.distance('YOU', 'SAN') == 6
+
+
+def test_transfers_from_the_center():
+    orbit_map = OrbitMap.from_lines(['COM)B', 'B)C', 'C)D', 'C)YOU'])
+    with pytest.raises(ValueError):
+        orbit_map.transfers('COM', 'D')
+    with pytest.raises(ValueError):
+        orbit_map.transfers('YOU', 'COM')
+    assert orbit_map.transfers('YOU', 'D') == 0
+
+
+def test_lines_in_any_order():
+    # most bodies are named as centers before the lines saying what they orbit
+    orbit_map = OrbitMap.from_lines(reversed(EXAMPLE + ['', 'K)YOU', 'I)SAN']))
+    assert orbit_map.total_orbits == 42 + 7 + 5
+    assert orbit_map.transfers('YOU', 'SAN') == 4
+
+
+def test_deep_chain():
+    # far deeper than the recursion limit
+    bodies = 200_000
+    lines = [f'{i}){i + 1}' for i in range(bodies)]
+    lines[0] = 'COM)1'
+    orbit_map = OrbitMap.from_lines(lines)
+    assert orbit_map.total_orbits == bodies * (bodies + 1) // 2
+    assert orbit_map.depth(str(bodies)) == bodies
+    assert orbit_map.common_center('5', str(bodies)) == '5'
+    assert orbit_map.distance('17', str(bodies - 3)) == bodies - 20
+    assert orbit_map.transfers(str(bodies), '2') == bodies - 2
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_trees(seed):
+    rng = random.Random(seed)
+    bodies = rng.randint(1, 300)
+    # each body orbits one added before it, often a recent one so that the tree grows deep
+    names = ['COM'] + [str(i) for i in range(1, bodies + 1)]
+    lines = []
+    for i in range(1, bodies + 1):
+        span = rng.choice([2, 20, i])
+        lines.append(f'{names[rng.randrange(max(0, i - span), i)]}){names[i]}')
+    rng.shuffle(lines)
+    mapping = build_orbit_mapping(lines)
+    orbit_map = OrbitMap.from_lines(lines)
+    chains = {body: get_chain(mapping, body) for body in mapping}
+    assert orbit_map.total_orbits == sum(len(chain) for chain in chains.values())
+    for body, chain in chains.items():
+        assert orbit_map.depth(body) == len(chain)
+        assert count_orbits(mapping, body) == len(chain)
+    names = list(mapping)
+    for _ in range(200):
+        a, b = rng.choice(names), rng.choice(names)
+        # the common center is the first body on both chains, counting each body as on its own
+        path_a, path_b = [a] + chains[a], [b] + chains[b]
+        common = next(body for body in path_a if body in path_b)
+        assert orbit_map.common_center(a, b) == common
+        assert orbit_map.distance(a, b) == path_a.index(common) + path_b.index(common)
+        if a != 'COM' and b != 'COM':
+            assert orbit_map.transfers(a, b) == orbit_map.distance(mapping[a], mapping[b])
@@ -0,0 +1,173 @@
+"""Run the solutions for any of the days, and report how long each took and how much memory it used.
+
+Every day runs in a fresh process, which imports only that day's module, so the import time
+reported is a cold start. Once every day has finished, their output is shown, followed by a table
+of:
+    import: time to import the day's module (and everything it imports)
+    part 1, part 2: time spent in its solve_part1() and solve_part2(), when main() calls them
+    both: time spent in its solve(), for days that solve both parts in one pass
+    total: time spent in its main()
+    peak RSS: the peak resident memory of its process
+
+Usage: python runner.py [DAY ...] [--jobs N]"""
+import argparse
+import contextlib
+import importlib
+import io
+import multiprocessing
+import multiprocessing.connection
+import os
+import re
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+DAY_FILE_RE = re.compile(r'day(\d+)\.py')
+
+# the directory of the days' modules, which also hold their input files
+DAYS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# the functions of a day's module that are timed, and the labels their times are reported under
+TIMED_FUNCTIONS = {'solve_part1': 'part 1', 'solve_part2': 'part 2', 'solve': 'both'}
+
+
+class DayResult(NamedTuple):
+    day: int
+    import_time: float
+    timings: Dict[str, float]  # time spent in each timed function, by label
+    total_time: float
+    peak_rss: Optional[int]  # in bytes, or None where it cannot be measured
+    output: str
+
+
+def discover_days(directory: str = None) -> List[int]:
+    """Return the numbers of the days with a solution module in directory (by default, the
+    directory this script is in), in order."""
+    if directory is None:
+        directory = DAYS_DIR
+    return sorted(int(match.group(1)) for match in map(DAY_FILE_RE.fullmatch, os.listdir(directory))
+                  if match)
+
+
+def peak_rss() -> Optional[int]:
+    """Return the peak resident memory of this process in bytes, if it can be measured."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024  # bytes on macOS, KiB elsewhere
+
+
+def _timed(function, timings: Dict[str, float], label: str):
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings[label] = timings.get(label, 0.0) + time.perf_counter() - start
+    return timed
+
+
+def run_day(day: int) -> DayResult:
+    """Import the module for the given day and run its main(), in this process."""
+    start = time.perf_counter()
+    module = importlib.import_module(f'day{day}')
+    import_time = time.perf_counter() - start
+    timings = {}
+    for name, label in TIMED_FUNCTIONS.items():
+        if hasattr(module, name):
+            setattr(module, name, _timed(getattr(module, name), timings, label))
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        module.main()
+    total_time = time.perf_counter() - start
+    return DayResult(day, import_time, timings, total_time, peak_rss(), output.getvalue())
+
+
+def _run_day_in_child(day: int, connection):
+    os.chdir(DAYS_DIR)  # the days open their input files by relative path
+    try:
+        connection.send(run_day(day))
+    except BaseException as exc:  # report the failure rather than leaving the parent waiting
+        connection.send(exc)
+        raise
+    finally:
+        connection.close()
+
+
+def run_days(days: List[int], jobs: int = 1) -> List[DayResult]:
+    """Run the given days, each in a fresh process, up to jobs of them at a time. Return their
+    results in the order the days were given. Processes are started rather than forked, so that
+    nothing imported by this process is shared with them."""
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    pending = list(days)
+    running = {}  # connection -> (day, process)
+    while pending or running:
+        while pending and len(running) < jobs:
+            day = pending.pop(0)
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_run_day_in_child, args=(day, sender))
+            process.start()
+            sender.close()
+            running[receiver] = day, process
+        for receiver in multiprocessing.connection.wait(list(running)):
+            day, process = running.pop(receiver)
+            try:
+                result = receiver.recv()
+            except EOFError:  # the process died without reporting back
+                result = RuntimeError(f'Day {day} exited with code {process.exitcode}')
+            process.join()
+            if isinstance(result, BaseException):
+                raise RuntimeError(f'Day {day} failed') from result
+            results[day] = result
+    return [results[day] for day in days]
+
+
+def report(results: List[DayResult]) -> str:
+    """Return a table of the timings and memory use of the given results."""
+    def seconds(value: Optional[float]) -> str:
+        return f'{value:9.3f}s' if value is not None else f'{"-":>10}'
+
+    labels = list(TIMED_FUNCTIONS.values())
+    lines = [f'{"day":>4} {"import":>10}' + ''.join(f' {label:>10}' for label in labels)
+             + f' {"total":>10} {"peak RSS":>12}']
+    for result in results:
+        rss = f'{result.peak_rss / 2 ** 20:10.1f}MB' if result.peak_rss is not None else '-'
+        lines.append(f'{result.day:>4} {seconds(result.import_time)}'
+                     + ''.join(f' {seconds(result.timings.get(label))}' for label in labels)
+                     + f' {seconds(result.total_time)} {rss:>12}')
+    return '\n'.join(lines)
+
+
+def main():
+    available = discover_days()
+    parser = argparse.ArgumentParser(description='Run the solutions for the given days.')
+    parser.add_argument('days', metavar='DAY', type=int, nargs='*',
+                        help=f'days to run (default: all of {", ".join(map(str, available))})')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='days to run at the same time, each in its own process (default: 1)')
+    args = parser.parse_args()
+    days = args.days or available
+    unknown = sorted(set(days) - set(available))
+    if unknown:
+        parser.error(f'no solution for day {", ".join(map(str, unknown))}')
+
+    start = time.perf_counter()
+    results = run_days(days, max(args.jobs, 1))
+    elapsed = time.perf_counter() - start
+    for result in results:
+        print(f'Day {result.day}:')
+        print(result.output, end='')
+    print()
+    print(report(results))
+    print(f'Ran {len(results)} days in {elapsed:.3f}s.')
+
+
+if __name__ == '__main__':
+    main()
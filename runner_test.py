@@ -0,0 +1,26 @@
+"""Tests for the day runner in runner.py"""
+from runner import discover_days, report, run_days
+
+
+def test_discover_days():
+    assert discover_days() == [1, 2, 3, 4, 5, 6, 7]
+
+
+def test_run_days():
+    results = run_days([6, 4], jobs=2)
+    assert [result.day for result in results] == [6, 4]
+    assert 'is 278744.' in results[0].output
+    assert results[1].output.startswith('1653 different passwords')
+    assert set(results[1].timings) == {'part 1', 'part 2'}
+    assert results[1].total_time >= sum(results[1].timings.values())
+    assert set(results[0].timings) == {'part 1', 'part 2'}
+    table = report(results).splitlines()
+    assert len(table) == 3
+    assert table[1].split()[0] == '6'
+
+
+def test_run_days_from_another_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result, = run_days([1])
+    assert 'is 3448043.' in result.output
+    assert set(result.timings) == {'both'}